@@ -4,10 +4,20 @@ const path = require('path');
 const Database = require('better-sqlite3');
 
 const DB_PATH = process.env.DB_PATH || path.join(__dirname, '..', 'data', 'events.db');
+// janela da pressão no live_state (minutos de jogo) — mesma do scraper
+const PRESS_WINDOW_MIN = Math.max(1, Number(process.env.PRESS_WINDOW_MIN || 6));
+// jogo sem tick há mais que isso (nunca fechado: scraper caiu) sai do live_state
+const LIVE_STATE_TTL_MS = Number(process.env.LIVE_STATE_TTL_MS || 6 * 60 * 60 * 1000);
 
 let db;
 let stmts = {};
 
+const TICK_EXTRA_COLS = [
+  ['sblk_home', 'INTEGER'], ['sblk_away', 'INTEGER'],
+  ['bc_home', 'INTEGER'],   ['bc_away', 'INTEGER'],
+  ['xg_home', 'REAL'],      ['xg_away', 'REAL'],
+];
+
 function ensureDir(p) { try { fs.mkdirSync(p, { recursive: true }); } catch {} }
 
 function pragma(db) {
@@ -129,6 +139,33 @@ function ensureSchema() {
       result        TEXT,                 -- 'green'|'red'|'void'
       pnl           REAL                  -- +0.1 | -1.0 | 0
     );
+
+    -- Estado "vivo" por jogo (1 linha/jogo), mantido a cada tick/previsão; o painel lê daqui
+    CREATE TABLE IF NOT EXISTS live_state (
+      event_id     TEXT PRIMARY KEY,
+      ts           INTEGER,               -- ts do último tick
+      minute       INTEGER,
+      status       TEXT,
+      league       TEXT,
+      home         TEXT,
+      away         TEXT,
+      url          TEXT,
+      goals_home   INTEGER, goals_away   INTEGER,
+      st_home      INTEGER, st_away      INTEGER,
+      sot_home     INTEGER, sot_away     INTEGER,
+      soff_home    INTEGER, soff_away    INTEGER,
+      da_home      INTEGER, da_away      INTEGER,
+      corners_home INTEGER, corners_away INTEGER,
+      sblk_home    INTEGER, sblk_away    INTEGER,
+      bc_home      INTEGER, bc_away      INTEGER,
+      xg_home      REAL,    xg_away      REAL,
+      press_home   REAL,    press_away   REAL,   -- Δ PRESS_WINDOW_MIN ponderado
+      d_sblk_home  INTEGER, d_sblk_away  INTEGER,
+      d_bc_home    INTEGER, d_bc_away    INTEGER,
+      d_xg_home    REAL,    d_xg_away    REAL,
+      preds        TEXT,                  -- JSON {"45": {"p": p, "ts": ts}, ...} (última por janela)
+      seq          INTEGER                -- ordem de atualização (push incremental do painel)
+    );
   `);
 
   // migrações simples
@@ -139,6 +176,10 @@ function ensureSchema() {
   if (!columnExists('pending_windows', 'sig')) {
     db.exec(`ALTER TABLE pending_windows ADD COLUMN sig TEXT;`);
   }
+  // colunas que o scraper coleta (bloqueados, grandes chances, xG)
+  for (const [col, type] of TICK_EXTRA_COLS) {
+    if (!columnExists('ticks', col)) db.exec(`ALTER TABLE ticks ADD COLUMN ${col} ${type};`);
+  }
 }
 
 function ensureIndexes() {
@@ -167,6 +208,10 @@ function ensureIndexes() {
     CREATE INDEX IF NOT EXISTS idx_signals_event   ON signals(event_id);
     CREATE INDEX IF NOT EXISTS idx_signals_status  ON signals(status);
     CREATE INDEX IF NOT EXISTS idx_signals_expire  ON signals(expire_minute);
+
+    -- estado vivo
+    CREATE INDEX IF NOT EXISTS idx_live_state_ts   ON live_state(ts);
+    CREATE INDEX IF NOT EXISTS idx_live_state_seq  ON live_state(seq);
   `);
 }
 
@@ -182,6 +227,8 @@ function prepareStatements() {
       away   = excluded.away
   `);
   stmts.closeMatch = db.prepare(`UPDATE matches SET closed_at = @closed_at WHERE event_id = @event_id`);
+  stmts.deleteLive = db.prepare(`DELETE FROM live_state WHERE event_id = ?`);
+  stmts.pruneLive = db.prepare(`DELETE FROM live_state WHERE ts < ?`);
 
   // ticks
   stmts.insertTick = db.prepare(`
@@ -190,16 +237,32 @@ function prepareStatements() {
       goals_home, goals_away,
       st_home, st_away, sot_home, sot_away,
       soff_home, soff_away, da_home, da_away,
-      corners_home, corners_away
+      corners_home, corners_away,
+      sblk_home, sblk_away, bc_home, bc_away, xg_home, xg_away
     ) VALUES (
       @event_id, @ts, @minute, @status,
       @goals_home, @goals_away,
       @st_home, @st_away, @sot_home, @sot_away,
       @soff_home, @soff_away, @da_home, @da_away,
-      @corners_home, @corners_away
+      @corners_home, @corners_away,
+      @sblk_home, @sblk_away, @bc_home, @bc_away, @xg_home, @xg_away
     )
   `);
-  stmts.insertTickBatch = db.transaction(rows => { for (const r of rows) stmts.insertTick.run(r); });
+  // tick + live_state na mesma transação
+  stmts.insertTickLive = db.transaction((row, deltas) => {
+    stmts.insertTick.run(tickParams(row));
+    upsertLiveTick(row, deltas);
+  });
+  // lote: grava tudo e atualiza o live_state só com o último tick de cada jogo
+  stmts.insertTickBatch = db.transaction(rows => {
+    const last = new Map();
+    for (const r of rows) {
+      stmts.insertTick.run(tickParams(r));
+      const prev = last.get(r.event_id);
+      if (!prev || r.ts >= prev.ts) last.set(r.event_id, r);
+    }
+    for (const r of last.values()) upsertLiveTick(r);
+  });
 
   // predictions
   stmts.insertPrediction = db.prepare(`
@@ -207,6 +270,61 @@ function prepareStatements() {
     VALUES (@event_id, @ts, @league, @home, @away, @minute, @window_min, @prob)
   `);
 
+  // estado vivo (upsert do último tick; previsões entram em preds sem tocar no resto)
+  stmts.upsertLive = db.prepare(`
+    INSERT INTO live_state (
+      event_id, ts, minute, status, league, home, away, url,
+      goals_home, goals_away, st_home, st_away, sot_home, sot_away,
+      soff_home, soff_away, da_home, da_away, corners_home, corners_away,
+      sblk_home, sblk_away, bc_home, bc_away, xg_home, xg_away,
+      press_home, press_away, d_sblk_home, d_sblk_away, d_bc_home, d_bc_away, d_xg_home, d_xg_away,
+      seq
+    )
+    SELECT
+      @event_id, @ts, @minute, @status, m.league, m.home, m.away, m.url,
+      @goals_home, @goals_away, @st_home, @st_away, @sot_home, @sot_away,
+      @soff_home, @soff_away, @da_home, @da_away, @corners_home, @corners_away,
+      @sblk_home, @sblk_away, @bc_home, @bc_away, @xg_home, @xg_away,
+      @press_home, @press_away, @d_sblk_home, @d_sblk_away, @d_bc_home, @d_bc_away, @d_xg_home, @d_xg_away,
+      (SELECT COALESCE(MAX(seq), 0) + 1 FROM live_state)
+    FROM (SELECT 1) LEFT JOIN matches m ON m.event_id = @event_id
+    WHERE true
+    ON CONFLICT(event_id) DO UPDATE SET
+      ts = excluded.ts, minute = excluded.minute, status = excluded.status,
+      league = COALESCE(excluded.league, live_state.league),
+      home   = COALESCE(excluded.home,   live_state.home),
+      away   = COALESCE(excluded.away,   live_state.away),
+      url    = COALESCE(excluded.url,    live_state.url),
+      goals_home = excluded.goals_home, goals_away = excluded.goals_away,
+      st_home = excluded.st_home, st_away = excluded.st_away,
+      sot_home = excluded.sot_home, sot_away = excluded.sot_away,
+      soff_home = excluded.soff_home, soff_away = excluded.soff_away,
+      da_home = excluded.da_home, da_away = excluded.da_away,
+      corners_home = excluded.corners_home, corners_away = excluded.corners_away,
+      sblk_home = excluded.sblk_home, sblk_away = excluded.sblk_away,
+      bc_home = excluded.bc_home, bc_away = excluded.bc_away,
+      xg_home = excluded.xg_home, xg_away = excluded.xg_away,
+      press_home = excluded.press_home, press_away = excluded.press_away,
+      d_sblk_home = excluded.d_sblk_home, d_sblk_away = excluded.d_sblk_away,
+      d_bc_home = excluded.d_bc_home, d_bc_away = excluded.d_bc_away,
+      d_xg_home = excluded.d_xg_home, d_xg_away = excluded.d_xg_away,
+      seq = excluded.seq
+  `);
+  stmts.setLivePrediction = db.prepare(`
+    UPDATE live_state
+       SET preds = json_set(COALESCE(preds, '{}'), '$."' || @window_min || '"',
+                            json_object('p', @prob, 'ts', @ts)),
+           seq   = (SELECT COALESCE(MAX(seq), 0) + 1 FROM live_state)
+     WHERE event_id = @event_id
+  `);
+  stmts.baselineByMinute = db.prepare(`
+    SELECT * FROM ticks
+    WHERE event_id = ? AND minute IS NOT NULL AND minute <= ?
+    ORDER BY minute DESC, ts DESC
+    LIMIT 1
+  `);
+  stmts.firstTick = db.prepare(`SELECT * FROM ticks WHERE event_id = ? ORDER BY ts ASC LIMIT 1`);
+
   // modelo
   stmts.bumpModel = db.prepare(`
     INSERT INTO model_counts (
@@ -269,15 +387,83 @@ function init() {
   ensureSchema();
   ensureIndexes();
   prepareStatements();
-  setInterval(() => { try { db.exec('PRAGMA optimize; ANALYZE;'); } catch {} }, 60 * 60 * 1000);
+  setInterval(() => {
+    try { stmts.pruneLive.run(Date.now() - LIVE_STATE_TTL_MS); } catch {}
+    try { db.exec('PRAGMA optimize; ANALYZE;'); } catch {}
+  }, 60 * 60 * 1000);
 }
 
 // API base
 function upsertMatch(obj) { stmts.upsertMatch.run({ ...obj, created_at: obj.created_at || Date.now() }); }
-function closeMatch(event_id) { stmts.closeMatch.run({ event_id, closed_at: Date.now() }); }
-function insertTick(row) { stmts.insertTick.run(row); }
+// jogo encerrado: sai do live_state (o painel manda 'remove' no próximo push)
+function closeMatch(event_id) {
+  stmts.closeMatch.run({ event_id, closed_at: Date.now() });
+  stmts.deleteLive.run(event_id);
+}
+// todo tick gravado atualiza o live_state aqui; deltas (ver windowDeltas) opcionais se o chamador já calculou
+function insertTick(row, deltas) { stmts.insertTickLive(row, deltas); }
 function insertTickBatch(rows) { if (rows?.length) stmts.insertTickBatch(rows); }
-function insertPrediction(row) { stmts.insertPrediction.run(row); }
+function insertPrediction(row) {
+  stmts.insertPrediction.run(row);
+  stmts.setLivePrediction.run({
+    event_id: row.event_id, window_min: row.window_min, prob: row.prob, ts: row.ts
+  });
+}
+
+function tickParams(row) {
+  const p = { ...row };
+  for (const [col] of TICK_EXTRA_COLS) p[col] = row[col] ?? null;
+  return p;
+}
+
+// ——— estado vivo ———
+const LIVE_COLS = [
+  'goals_home', 'goals_away', 'st_home', 'st_away', 'sot_home', 'sot_away',
+  'soff_home', 'soff_away', 'da_home', 'da_away', 'corners_home', 'corners_away',
+  'sblk_home', 'sblk_away', 'bc_home', 'bc_away', 'xg_home', 'xg_away'
+];
+
+// pressão ponderada a partir dos Δ da janela (mesmos pesos do scraper/painel)
+function pressureFromDelta(dh, da) {
+  const ph = (dh.sot || 0) * 3 + (dh.soff || 0) * 1.5 + (dh.da || 0) * 0.5 + (dh.corners || 0) * 0.5;
+  const pa = (da.sot || 0) * 3 + (da.soff || 0) * 1.5 + (da.da || 0) * 0.5 + (da.corners || 0) * 0.5;
+  return { home: +ph.toFixed(2), away: +pa.toFixed(2) };
+}
+
+// Δ entre o tick e o baseline da janela, por lado: { home: { sot, soff, da, corners, sblk, bc, xg }, away }
+function windowDeltas(row, base) {
+  const d = (k) => (row[k] || 0) - ((base && base[k]) || 0);
+  const side = (s) => ({
+    sot: d(`sot_${s}`), soff: d(`soff_${s}`), da: d(`da_${s}`), corners: d(`corners_${s}`),
+    sblk: d(`sblk_${s}`), bc: d(`bc_${s}`), xg: d(`xg_${s}`),
+  });
+  return { home: side('home'), away: side('away') };
+}
+
+// baseline por minuto de jogo (<= minuto - PRESS_WINDOW_MIN); no começo do jogo, o primeiro tick
+function baselineTick(row) {
+  const minuteNow = Number.isFinite(row.minute) ? row.minute : 0;
+  const targetMin = Math.max(0, minuteNow - PRESS_WINDOW_MIN);
+  return stmts.baselineByMinute.get(row.event_id, targetMin)
+      || stmts.firstTick.get(row.event_id)
+      || row;
+}
+
+// upsert da linha do jogo; sem deltas, busca o baseline (1 lookup indexado)
+function upsertLiveTick(row, deltas) {
+  const { home, away } = deltas || windowDeltas(row, baselineTick(row));
+  const press = pressureFromDelta(home, away);
+
+  const p = {
+    event_id: row.event_id, ts: row.ts, minute: row.minute ?? null, status: row.status ?? null,
+    press_home: press.home, press_away: press.away,
+    d_sblk_home: home.sblk, d_sblk_away: away.sblk,
+    d_bc_home: home.bc, d_bc_away: away.bc,
+    d_xg_home: +home.xg.toFixed(3), d_xg_away: +away.xg.toFixed(3),
+  };
+  for (const k of LIVE_COLS) p[k] = row[k] ?? null;
+  stmts.upsertLive.run(p);
+}
 
 function getTicksRange(event_id, fromTs, toTs) { return stmts.getTicksRange.all(event_id, fromTs, toTs); }
 function getLastTick(event_id) { return stmts.getLastTick.get(event_id); }
@@ -297,6 +483,7 @@ function getModelRow(...args) { return stmts.getModelRow.get(...args); }
 module.exports = {
   init, path: DB_PATH,
   upsertMatch, closeMatch, insertTick, insertTickBatch, insertPrediction,
+  windowDeltas, pressureFromDelta,
   getTicksRange, getLastTick,
   bumpModel, addPending, getOpenPendings, settlePending,
   insertSignal, getOpenSignals, settleSignal, getModelRow
@@ -0,0 +1,49 @@
+// src/engine/lgbm_features.js
+// Features no formato do treino (src/ml/train_goal_half_lgbm.py / FEATURE_ORDER):
+// minute, goal_diff, press_*, d_* (janela de LOOKBACK_MIN) e cum_*.
+// Usado pelo live_goal_half_ml (servidor) e pelo ml_infer (destilado).
+
+const LOOKBACK_MIN = Number(process.env.PRESS_LOOKBACK_MIN || 6);
+
+function num(v){ return Number.isFinite(v) ? v : 0; }
+
+// rows: ticks do jogo em ordem crescente de minuto
+function buildFeatures(rows, minute) {
+  if (!rows || !rows.length) return {};
+  const mFrom = Math.max(0, minute - LOOKBACK_MIN);
+  const win = rows.filter(r => (r.minute||0) >= mFrom && (r.minute||0) <= minute);
+  const base = win.length ? win[0] : rows[0];
+  const last = win.length ? win[win.length-1] : rows[rows.length-1];
+
+  const dpair = (h,a) => [ num(last[h])-num(base[h]), num(last[a])-num(base[a]) ];
+  const [d_sot_h, d_sot_a] = dpair('sot_home','sot_away');
+  const [d_sof_h, d_sof_a] = dpair('soff_home','soff_away');
+  const [d_da_h,  d_da_a ] = dpair('da_home','da_away');
+  const [d_co_h,  d_co_a ] = dpair('corners_home','corners_away');
+
+  const press_home = 3*d_sot_h + 1.5*d_sof_h + 0.5*d_da_h + 0.5*d_co_h;
+  const press_away = 3*d_sot_a + 1.5*d_sof_a + 0.5*d_da_a + 0.5*d_co_a;
+
+  const feat = {};
+  feat.minute = num(minute);
+  feat.goal_diff = num(last.goals_home) - num(last.goals_away);
+  feat.press_home = num(press_home);
+  feat.press_away = num(press_away);
+
+  feat.d_sot_home = num(d_sot_h);
+  feat.d_sot_away = num(d_sot_a);
+  feat.d_soff_home = num(d_sof_h);
+  feat.d_soff_away = num(d_sof_a);
+  feat.d_corners_home = num(d_co_h);
+  feat.d_corners_away = num(d_co_a);
+  feat.d_da_home = num(d_da_h);
+  feat.d_da_away = num(d_da_a);
+
+  const keys = ['st_home','st_away','sot_home','sot_away','soff_home','soff_away',
+                'da_home','da_away','corners_home','corners_away','goals_home','goals_away'];
+  for (const k of keys) feat['cum_'+k] = num(last[k]);
+
+  return feat;
+}
+
+module.exports = { buildFeatures, LOOKBACK_MIN };
@@ -3,7 +3,8 @@
 
 const db = require('../db');
 const { featurizeForMinute } = require('./featurize');
-const { predictGoalProbs } = require('./ml_infer');
+const { predictGoalProbs, requestPriority } = require('./ml_infer');
+const { buildFeatures } = require('./lgbm_features');
 
 // —— Política ——
 const THRESH_HT = Number(process.env.P_HT || 0.62);
@@ -71,9 +72,13 @@ async function onTickAnalyze(ctx) {
 
   const { features, aux } = featurizeForMinute(ctx.event_id, curr, hist);
   aux.event_id = ctx.event_id;
+  // mesmas features do treino (servidor LightGBM / destilado)
+  const modelFeatures = buildFeatures(hist.filter(r => r.minute != null), ctx.minute);
 
   // 2) previsão P(gol até o fim do tempo atual)
-  const { p_ht, p_ft } = await predictGoalProbs(features);
+  const hasOpen = (db.getOpenSignals(ctx.event_id) || []).length > 0;
+  const priority = requestPriority(ctx.minute, hasOpen, { htMax: MAX_MIN_HT, ftMax: MAX_MIN_FT });
+  const { p_ht, p_ft, p_win } = await predictGoalProbs(features, { priority, modelFeatures });
 
   // 3) salvar previsões para o painel (dois “windows” especiais 45 e 90 só para mostrar)
   db.insertPrediction({
@@ -86,6 +91,15 @@ async function onTickAnalyze(ctx) {
     league: ctx.league || '', home: ctx.home || '', away: ctx.away || '',
     minute: ctx.minute || 0, window_min: 90, prob: +(p_ft.toFixed(4))
   });
+  // janelas "gol nos próximos k min" que o servidor devolve na mesma chamada (p_win)
+  for (const [k, p] of Object.entries(p_win || {})) {
+    if (!Number.isFinite(p)) continue;
+    db.insertPrediction({
+      event_id: ctx.event_id, ts: nowTs,
+      league: ctx.league || '', home: ctx.home || '', away: ctx.away || '',
+      minute: ctx.minute || 0, window_min: Number(k), prob: +(p.toFixed(4))
+    });
+  }
 
   // 4) decidir entradas
   const minute = ctx.minute || 0;
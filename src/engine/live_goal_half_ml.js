@@ -3,9 +3,13 @@ const path = require('path');
 const Better = require('better-sqlite3');
 const fs = require('fs');
 const db = require('../db');
+const { requestPriority } = require('./ml_infer');
+// features no formato do treino/calibração
+const { buildFeatures, LOOKBACK_MIN } = require('./lgbm_features');
 
-const LOOKBACK_MIN = Number(process.env.PRESS_LOOKBACK_MIN || 6);
 const ML_URL = process.env.ML_URL || 'http://127.0.0.1:8009/predict';
+// orçamento por requisição: o servidor recebe deadline_ms e o cliente desiste no mesmo prazo
+const ML_TIMEOUT_MS = Number(process.env.ML_TIMEOUT_MS || 800);
 
 const HT_MAX_MINUTE = 35;
 const FT_MAX_MINUTE = 80;
@@ -37,54 +41,20 @@ const qWin = () => ensureRaw().prepare(`
 `);
 const qLast = () => ensureRaw().prepare(`SELECT * FROM ticks WHERE event_id=? ORDER BY ts DESC LIMIT 1`);
 
-// ===== features (mesma lógica do treino/calibração) =====
-function num(v){ return Number.isFinite(v) ? v : 0; }
-function buildFeatures(rows, minute) {
-  if (!rows || !rows.length) return {};
-  const mFrom = Math.max(0, minute - LOOKBACK_MIN);
-  const win = rows.filter(r => (r.minute||0) >= mFrom && (r.minute||0) <= minute);
-  const base = win.length ? win[0] : rows[0];
-  const last = win.length ? win[win.length-1] : rows[rows.length-1];
-
-  const dpair = (h,a) => [ num(last[h])-num(base[h]), num(last[a])-num(base[a]) ];
-  const [d_sot_h, d_sot_a] = dpair('sot_home','sot_away');
-  const [d_sof_h, d_sof_a] = dpair('soff_home','soff_away');
-  const [d_da_h,  d_da_a ] = dpair('da_home','da_away');
-  const [d_co_h,  d_co_a ] = dpair('corners_home','corners_away');
-
-  const press_home = 3*d_sot_h + 1.5*d_sof_h + 0.5*d_da_h + 0.5*d_co_h;
-  const press_away = 3*d_sot_a + 1.5*d_sof_a + 0.5*d_da_a + 0.5*d_co_a;
-
-  const feat = {};
-  feat.minute = num(minute);
-  feat.goal_diff = num(last.goals_home) - num(last.goals_away);
-  feat.press_home = num(press_home);
-  feat.press_away = num(press_away);
-
-  feat.d_sot_home = num(d_sot_h);
-  feat.d_sot_away = num(d_sot_a);
-  feat.d_soff_home = num(d_sof_h);
-  feat.d_soff_away = num(d_sof_a);
-  feat.d_corners_home = num(d_co_h);
-  feat.d_corners_away = num(d_co_a);
-  feat.d_da_home = num(d_da_h);
-  feat.d_da_away = num(d_da_a);
-
-  const keys = ['st_home','st_away','sot_home','sot_away','soff_home','soff_away',
-                'da_home','da_away','corners_home','corners_away','goals_home','goals_away'];
-  for (const k of keys) feat['cum_'+k] = num(last[k]);
-
-  return feat;
-}
-
 // ===== emitir sinais HT/FT =====
-async function httpPost(url, data) {
-  const res = await fetch(url, {
-    method:'POST', headers:{'Content-Type':'application/json'},
-    body: JSON.stringify(data)
-  });
-  if (!res.ok) throw new Error(`HTTP ${res.status}`);
-  return await res.json();
+async function httpPost(url, data, timeoutMs) {
+  const ctrl = new AbortController();
+  const timer = setTimeout(() => ctrl.abort(), timeoutMs);
+  try {
+    const res = await fetch(url, {
+      method:'POST', headers:{'Content-Type':'application/json'},
+      body: JSON.stringify(data), signal: ctrl.signal
+    });
+    if (!res.ok) throw new Error(`HTTP ${res.status}`);
+    return await res.json();
+  } finally {
+    clearTimeout(timer);
+  }
 }
 
 function hasOpenSide(event_id, side) {
@@ -101,7 +71,12 @@ async function onTickAnalyze(ctx) {
   const features = buildFeatures(rows, ctx.minute);
   let p_ht=0, p_ft=0;
   try {
-    const r = await httpPost(ML_URL, { features });
+    const hasOpen = hasOpenSide(ctx.event_id, 'HT') || hasOpenSide(ctx.event_id, 'FT');
+    const priority = requestPriority(ctx.minute, hasOpen, { htMax: HT_MAX_MINUTE, ftMax: FT_MAX_MINUTE });
+    // margem para rede/serialização dentro do timeout do cliente
+    const r = await httpPost(ML_URL, {
+      features, priority, deadline_ms: Math.max(1, ML_TIMEOUT_MS - 50)
+    }, ML_TIMEOUT_MS);
     p_ht = Number(r.p_ht || 0); p_ft = Number(r.p_ft || 0);
   } catch (e) {
     return; // silencioso
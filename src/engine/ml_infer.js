@@ -1,11 +1,28 @@
 // src/engine/ml_infer.js
 // Predição de P(gol até o fim do tempo ATUAL): retorna { p_ht, p_ft }.
 // 1) tenta microserviço Python (opcional) em ML_URL
-// 2) fallback: heurística calibrada sobre features (funciona já)
+// 2) fallback: logístico destilado do LightGBM (models/distilled.json), se existir
+// 3) fallback: heurística calibrada sobre features (funciona já)
 
-const fetch = (...args) => import('node-fetch').then(({default: f}) => f(...args));
+const fs = require('fs');
+const path = require('path');
 
 const ML_URL = process.env.ML_URL || 'http://127.0.0.1:5005/predict';
+const MODELS_DIR = process.env.MODELS_DIR || path.join(__dirname, '..', '..', 'models');
+// pré-filtro: se o destilado der p_ht e p_ft abaixo disso, nem chama o servidor (0 = desligado)
+const PREFILTER_MAX = Number(process.env.ML_PREFILTER_MAX || 0);
+// fração mínima de DISTILLED.feature_names presente na entrada para confiar no destilado
+const DISTILLED_MIN_COVERAGE = Number(process.env.ML_DISTILLED_MIN_COVERAGE || 0.5);
+
+// admissão no servidor: orçamento (deadline) e prioridade por requisição
+const ML_TIMEOUT_MS = Number(process.env.ML_TIMEOUT_MS || 800);
+const PRIORITY_LEAD_MIN = Number(process.env.ML_PRIORITY_LEAD_MIN || 10);
+
+// modelo destilado (gerado por src/ml/train_goal_half_lgbm.py): z = intercept + Σ coef_i * x_i
+let DISTILLED = null;
+try {
+  DISTILLED = JSON.parse(fs.readFileSync(path.join(MODELS_DIR, 'distilled.json'), 'utf8'));
+} catch { /* sem destilado: usa heurística */ }
 
 // regressão logística “manual” só pra ter um fallback razoável
 function sigmoid(x){ return 1/(1+Math.exp(-x)); }
@@ -31,31 +48,81 @@ function heuristicProb(features, half) {
   return Math.max(0.01, Math.min(0.95, pMin));
 }
 
+// features no formato do treino (lgbm_features.buildFeatures); null se a entrada não cobre o modelo
+function distilledProb(features, half) {
+  const m = DISTILLED && DISTILLED[half === 'HT' ? 'ht' : 'ft'];
+  if (!m || !features) return null;
+  const names = DISTILLED.feature_names;
+  const present = names.filter(k => Number.isFinite(Number(features[k]))).length;
+  if (!names.length || present < DISTILLED_MIN_COVERAGE * names.length) return null;
+  let z = m.intercept;
+  for (let i = 0; i < names.length; i++) z += m.coef[i] * (Number(features[names[i]]) || 0);
+  return sigmoid(z);
+}
+
+// 2 = sinal aberto; 1 = perto do fim da janela de entrada HT/FT; 0 = normal;
+// -1 = já passou do ftMax (não gera sinal novo). limits = { htMax, ftMax } da política de quem chama
+function requestPriority(minute, hasOpenSignal, limits) {
+  const m = Number(minute) || 0;
+  const { htMax, ftMax } = limits;
+  if (hasOpenSignal) return 2;
+  if (m > ftMax) return -1;
+  if ((m <= htMax && m >= htMax - PRIORITY_LEAD_MIN) ||
+      (m <= ftMax && m >= ftMax - PRIORITY_LEAD_MIN)) return 1;
+  return 0;
+}
+
 // se o Python estiver rodando, melhor usar o hazard/GBM calibrado
+// (fetch global do Node 18+; o cliente desiste em ML_TIMEOUT_MS)
 async function inferWithServer(payload) {
+  const ctrl = new AbortController();
+  const timer = setTimeout(() => ctrl.abort(), ML_TIMEOUT_MS);
   try {
     const r = await fetch(ML_URL, {
       method: 'POST',
       headers: {'content-type':'application/json'},
       body: JSON.stringify(payload),
-      timeout: 800
+      signal: ctrl.signal
     });
     if (!r.ok) throw new Error(String(r.status));
     const j = await r.json();
     if (typeof j.p_ht === 'number' && typeof j.p_ft === 'number') return j;
-  } catch {}
+  } catch {
+  } finally {
+    clearTimeout(timer);
+  }
   return null;
 }
 
-async function predictGoalProbs(feats) {
-  const payload = { features: feats };
+// feats: features do featurize (heurística)
+// opts: { priority, modelFeatures } — priority: ver requestPriority (o servidor responde 503 rápido
+// se não cumprir o prazo); modelFeatures: features no formato do treino (servidor e destilado)
+async function predictGoalProbs(feats, opts = {}) {
+  const mfeats = opts.modelFeatures || feats;
+  const d_ht = distilledProb(mfeats, 'HT');
+  const d_ft = distilledProb(mfeats, 'FT');
+  const hasDistilled = d_ht != null && d_ft != null;
+
+  // jogo claramente frio pelo destilado: poupa o round-trip HTTP
+  if (hasDistilled && PREFILTER_MAX > 0 && d_ht < PREFILTER_MAX && d_ft < PREFILTER_MAX) {
+    return { p_ht: d_ht, p_ft: d_ft };
+  }
+
+  // margem para rede/serialização dentro do timeout do cliente
+  const payload = {
+    features: mfeats,
+    priority: opts.priority || 0,
+    deadline_ms: Math.max(1, ML_TIMEOUT_MS - 50)
+  };
   const online = await inferWithServer(payload);
   if (online) return online;
 
+  if (hasDistilled) return { p_ht: d_ht, p_ft: d_ft };
+
   // fallback heurístico
   const p_ht = heuristicProb(feats, 'HT');
   const p_ft = heuristicProb(feats, 'FT');
   return { p_ht, p_ft };
 }
 
-module.exports = { predictGoalProbs };
+module.exports = { predictGoalProbs, requestPriority };
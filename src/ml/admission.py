@@ -0,0 +1,188 @@
+# src/ml/admission.py
+# Camada de admissão para /predict: fila por prioridade com deadline por requisição.
+# - prioridade maior sai primeiro (empate: deadline mais cedo, depois ordem de chegada)
+# - requisição que já não cumpre o deadline falha rápido em vez de ocupar o worker
+# - fila cheia: descarta a de menor prioridade (a nova, se for ela)
+# - estatísticas de espera na fila / tempo de serviço para /stats
+
+import os, time, heapq, threading, itertools
+from typing import Callable, Dict, Optional
+
+WORKERS             = int(os.environ.get("ADMISSION_WORKERS", "2"))
+MAX_QUEUE           = int(os.environ.get("ADMISSION_MAX_QUEUE", "256"))
+DEFAULT_DEADLINE_MS = float(os.environ.get("ADMISSION_DEFAULT_DEADLINE_MS", "0"))  # 0 = sem deadline
+EWMA_ALPHA          = 0.05
+
+class Rejected(Exception):
+    """Requisição recusada pela admissão; reason = 'deadline' | 'shed'."""
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+class _Job:
+    __slots__ = ("fn", "priority", "deadline", "enq", "done", "result", "error",
+                 "state", "on_done", "entry")
+
+    def __init__(self, fn, priority, deadline, on_done=None):
+        self.fn = fn
+        self.priority = priority
+        self.deadline = deadline
+        self.enq = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.state = "queued"         # queued -> running -> done | cancelled
+        self.on_done = on_done        # chamado (em qualquer thread) quando o job termina/é recusado
+        self.entry = None             # tupla no heap, enquanto estiver na fila
+
+class AdmissionQueue:
+    def __init__(self, workers: int = WORKERS, max_queue: int = MAX_QUEUE):
+        self.max_queue = max(1, max_queue)
+        self.heap = []
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.stats = {"served": 0, "expired": 0, "shed": 0,
+                      "queue_ms_ewma": 0.0, "queue_ms_max": 0.0, "service_ms_ewma": 0.0}
+        self.by_priority: Dict[int, Dict[str, int]] = {}
+        self.n_workers = max(1, workers)
+        for i in range(self.n_workers):
+            threading.Thread(target=self._worker, name=f"admission-{i}", daemon=True).start()
+
+    # ---------- API ----------
+    def submit(self, fn: Callable, priority: int = 0, deadline_ms: Optional[float] = None,
+               on_done: Optional[Callable] = None) -> _Job:
+        """
+        Enfileira fn() sem bloquear; levanta Rejected se a admissão recusar na hora.
+        on_done(job) é chamado quando job.result/job.error estiverem prontos.
+        """
+        budget = deadline_ms if deadline_ms is not None else DEFAULT_DEADLINE_MS
+        deadline = time.monotonic() + budget / 1000.0 if budget and budget > 0 else None
+        job = _Job(fn, int(priority), deadline, on_done)
+
+        victim = None
+        with self.cond:
+            if deadline is not None and not self._can_meet(job):
+                self._count(job, "expired")
+                raise Rejected("deadline")
+            if len(self.heap) >= self.max_queue:
+                victim = self._lowest()
+                if victim is None or victim.priority >= job.priority:
+                    self._count(job, "shed")
+                    raise Rejected("shed")
+                self._unqueue(victim)
+                self._count(victim, "shed")
+                victim.state = "done"
+                victim.error = Rejected("shed")
+            job.entry = (-job.priority, deadline or float("inf"), next(self.seq), job)
+            heapq.heappush(self.heap, job.entry)
+            self.cond.notify()
+        if victim is not None:
+            self._finish(victim)
+        return job
+
+    def cancel(self, job: _Job) -> bool:
+        """
+        Desiste do job (deadline estourado do lado de quem pediu): sai da fila na hora e conta
+        como expirado; se já estiver rodando, o resultado é descartado. False se já terminou.
+        """
+        with self.cond:
+            if job.state not in ("queued", "running"):
+                return False
+            if job.state == "queued":
+                self._unqueue(job)
+            job.state = "cancelled"
+            job.error = Rejected("deadline")
+            self._count(job, "expired")
+        self._finish(job)
+        return True
+
+    def remaining(self, job: _Job) -> Optional[float]:
+        """Segundos até o deadline do job (None = sem deadline)."""
+        return None if job.deadline is None else max(0.0, job.deadline - time.monotonic())
+
+    def run(self, fn: Callable, priority: int = 0, deadline_ms: Optional[float] = None):
+        """Executa fn() num worker respeitando prioridade/deadline; levanta Rejected."""
+        job = self.submit(fn, priority, deadline_ms)
+        if not job.done.wait(self.remaining(job)) and self.cancel(job):
+            raise Rejected("deadline")
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def snapshot(self) -> Dict:
+        with self.cond:
+            out = dict(self.stats)
+            out["queue_depth"] = len(self.heap)
+            out["workers"] = self.n_workers
+            out["max_queue"] = self.max_queue
+            out["by_priority"] = {str(k): dict(v) for k, v in sorted(self.by_priority.items())}
+        for k in ("queue_ms_ewma", "queue_ms_max", "service_ms_ewma"):
+            out[k] = round(out[k], 2)
+        return out
+
+    # ---------- internos (chamados com self.cond) ----------
+    def _lowest(self) -> Optional[_Job]:
+        return max((e for e in self.heap), key=lambda e: (e[0], e[1], e[2]), default=(None,))[-1]
+
+    def _unqueue(self, job: _Job):
+        self.heap.remove(job.entry)
+        heapq.heapify(self.heap)
+        job.entry = None
+
+    def _can_meet(self, job: _Job) -> bool:
+        # estimativa: à frente desta (prioridade >=) + o próprio serviço, dividido pelos workers
+        ahead = sum(1 for e in self.heap if -e[0] >= job.priority)
+        est = (ahead / self.n_workers + 1) * self.stats["service_ms_ewma"] / 1000.0
+        return time.monotonic() + est <= job.deadline
+
+    def _count(self, job: _Job, key: str):
+        self.stats[key] += 1
+        d = self.by_priority.setdefault(job.priority, {"served": 0, "expired": 0, "shed": 0})
+        d[key] += 1
+
+    @staticmethod
+    def _finish(job: _Job):
+        # fora do lock: on_done pode agendar trabalho em outra thread/loop
+        job.done.set()
+        if job.on_done is not None:
+            job.on_done(job)
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                while not self.heap:
+                    self.cond.wait()
+                job = heapq.heappop(self.heap)[-1]
+                job.entry = None
+                now = time.monotonic()
+                expired = (job.deadline is not None and
+                           now + self.stats["service_ms_ewma"] / 1000.0 > job.deadline)
+                if expired:
+                    job.state = "done"
+                    job.error = Rejected("deadline")
+                    self._count(job, "expired")
+                else:
+                    job.state = "running"
+                    q_ms = (now - job.enq) * 1000.0
+                    self.stats["queue_ms_ewma"] += EWMA_ALPHA * (q_ms - self.stats["queue_ms_ewma"])
+                    self.stats["queue_ms_max"] = max(self.stats["queue_ms_max"], q_ms)
+            if expired:
+                self._finish(job)
+                continue
+
+            t0 = time.monotonic()
+            result, error = None, None
+            try:
+                result = job.fn()
+            except Exception as e:
+                error = e
+            s_ms = (time.monotonic() - t0) * 1000.0
+
+            with self.cond:
+                self.stats["service_ms_ewma"] += EWMA_ALPHA * (s_ms - self.stats["service_ms_ewma"])
+                if job.state == "cancelled":   # quem pediu já desistiu (contado em cancel)
+                    continue
+                job.result, job.error = result, error
+                job.state = "done"
+                self._count(job, "served")
+            self._finish(job)
@@ -1,8 +1,9 @@
 # src/ml/calibrate_thresholds.py
 import os, json, sqlite3, random, time
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Callable
 import numpy as np
 import lightgbm as lgb
+import hazard
 
 # ---------- paths / params ----------
 ROOT       = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -11,6 +12,8 @@ MODELS_DIR = os.environ.get("MODELS_DIR", os.path.join(ROOT, "..", "models"))
 
 HT_MODEL   = os.path.join(MODELS_DIR, "ht_lgbm.txt")
 FT_MODEL   = os.path.join(MODELS_DIR, "ft_lgbm.txt")
+HAZ_MODEL  = os.path.join(MODELS_DIR, hazard.HAZARD_MODEL_FILE)
+MODEL_TYPE = hazard.model_type(MODELS_DIR)
 FNAMES     = os.path.join(MODELS_DIR, "feature_names.json")
 OUT_THRESH = os.path.join(MODELS_DIR, "thresholds.json")
 
@@ -158,7 +161,7 @@ def first_goal_after(goal_mins: List[int], start_min: int) -> Optional[int]:
 # ---------- simulação ----------
 def simulate_match_signals(
     rows: List[sqlite3.Row],
-    bst: lgb.Booster,
+    predict_fn: Callable[[np.ndarray], float],
     FEATURE_NAMES: List[str],
     signal_type: str,            # "HT" | "FT_PRE" | "FT_POST"
     thr: float
@@ -215,7 +218,7 @@ def simulate_match_signals(
             else:
                 fdict = build_feature_dict(rows, m)
                 x = to_vector(fdict, FEATURE_NAMES)
-                p = float(bst.predict(x[None, :], predict_disable_shape_check=True)[0])
+                p = predict_fn(x)
                 if p >= thr:
                     open_flag = True
                     open_min = m
@@ -249,7 +252,7 @@ def simulate_match_signals(
 def simulate_dataset(
     events: List[str],
     conn,
-    bst: lgb.Booster,
+    predict_fn: Callable[[np.ndarray], float],
     FEATURE_NAMES: List[str],
     signal_type: str,
     thr: float,
@@ -264,7 +267,7 @@ def simulate_dataset(
     for i, eid in enumerate(events, 1):
         rows = q_ticks(conn, eid)
         if rows:
-            n, h, p = simulate_match_signals(rows, bst, FEATURE_NAMES, signal_type, thr)
+            n, h, p = simulate_match_signals(rows, predict_fn, FEATURE_NAMES, signal_type, thr)
             n_tot += n
             hits_tot += h
             pnl_tot  += p
@@ -275,28 +278,50 @@ def simulate_dataset(
     return (n_tot, hits_tot, pnl_tot)
 
 # ---------- main ----------
-def main():
-    if not (os.path.exists(HT_MODEL) and os.path.exists(FT_MODEL)):
-        raise RuntimeError(f"Modelos não encontrados em {MODELS_DIR}")
+def booster_predictor(bst: lgb.Booster) -> Callable[[np.ndarray], float]:
+    return lambda x: float(bst.predict(x[None, :], predict_disable_shape_check=True)[0])
+
+def hazard_predictor(bst: lgb.Booster, minute_idx: int, end_min: int) -> Callable[[np.ndarray], float]:
+    # uma linha por minuto simulado: horizonte L = end_min - m
+    def fn(x: np.ndarray) -> float:
+        L = end_min - float(x[minute_idx])
+        if L <= 0:
+            return 0.0
+        return float(bst.predict(hazard.with_horizon(x[None, :], [L]))[0])
+    return fn
 
-    bst_ht = lgb.Booster(model_file=HT_MODEL)
-    bst_ft = lgb.Booster(model_file=FT_MODEL)
+def main():
+    if MODEL_TYPE == "hazard":
+        if not os.path.exists(HAZ_MODEL):
+            raise RuntimeError(f"Modelo hazard não encontrado em {MODELS_DIR}")
+        bst_hz = lgb.Booster(model_file=HAZ_MODEL)
+        model_names = list(bst_hz.feature_name())[:-1]   # última coluna = TIME_FEATURE
+        hazard.check_booster(bst_hz, len(model_names))
+        models_desc = f"{hazard.HAZARD_MODEL_FILE}(n_feat={bst_hz.num_feature()})"
+    else:
+        if not (os.path.exists(HT_MODEL) and os.path.exists(FT_MODEL)):
+            raise RuntimeError(f"Modelos não encontrados em {MODELS_DIR}")
+        bst_ht = lgb.Booster(model_file=HT_MODEL)
+        bst_ft = lgb.Booster(model_file=FT_MODEL)
+        model_names = list(bst_ht.feature_name())
+        models_desc = (f"ht_lgbm.txt(n_feat={len(bst_ht.feature_name())}), "
+                       f"ft_lgbm.txt(n_feat={len(bst_ft.feature_name())})")
 
     # features
     try:
         with open(FNAMES, "r", encoding="utf-8") as f:
             FEATURE_NAMES = json.load(f)
-        if not isinstance(FEATURE_NAMES, list) or len(FEATURE_NAMES) != len(bst_ht.feature_name()):
+        if not isinstance(FEATURE_NAMES, list) or len(FEATURE_NAMES) != len(model_names):
             raise ValueError("feature_names.json divergente")
     except Exception:
-        FEATURE_NAMES = list(bst_ht.feature_name())
+        FEATURE_NAMES = model_names
         os.makedirs(MODELS_DIR, exist_ok=True)
         with open(FNAMES, "w", encoding="utf-8") as f:
             json.dump(FEATURE_NAMES, f, ensure_ascii=False, indent=2)
         print(f"[cal] feature_names.json divergente; reconstruído com {len(FEATURE_NAMES)} features.")
 
     print(f"[cal] usando DB: {DB_PATH}")
-    print(f"[cal] models: ht_lgbm.txt(n_feat={len(bst_ht.feature_name())}), ft_lgbm.txt(n_feat={len(bst_ft.feature_name())})")
+    print(f"[cal] models ({MODEL_TYPE}): {models_desc}")
     print(f"[cal] features: {len(FEATURE_NAMES)}  verbose={CALIB_VERBOSE} log_every={LOG_EVERY}")
 
     conn = connect()
@@ -305,7 +330,11 @@ def main():
 
     def best_for(signal_type: str, min_sigs: int) -> Dict[str, float]:
         best = {"thr": None, "pnl": -1e18, "n": 0, "hits": 0}
-        model = bst_ht if signal_type == "HT" else bst_ft
+        if MODEL_TYPE == "hazard":
+            end_min = hazard.HT_END if signal_type == "HT" else hazard.FT_END
+            model = hazard_predictor(bst_hz, FEATURE_NAMES.index("minute"), end_min)
+        else:
+            model = booster_predictor(bst_ht if signal_type == "HT" else bst_ft)
         t0 = time.time()
         for thr in GRID:
             n, h, p = simulate_dataset(
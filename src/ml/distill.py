@@ -0,0 +1,73 @@
+# src/ml/distill.py
+# Destilação: modelo logístico compacto que imita as saídas do LightGBM.
+# Ajuste por ridge no logit do professor (features padronizadas), exportado em JSON
+# com pesos já na escala original -> o Node avalia z = b + sum(w_i * x_i) em microssegundos.
+
+import os, json
+from typing import Dict, List
+import numpy as np
+
+DISTILLED_FILE = "distilled.json"
+DISTILL_L2     = float(os.environ.get("DISTILL_L2", "1.0"))
+# limiar usado só para medir concordância de decisão professor x aluno
+DISTILL_THR    = float(os.environ.get("DISTILL_THR", "0.55"))
+
+def _logit(p: np.ndarray) -> np.ndarray:
+    p = np.clip(np.asarray(p, dtype=np.float64), 1e-4, 1 - 1e-4)
+    return np.log(p / (1 - p))
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-z))
+
+def _auc(y: np.ndarray, p: np.ndarray):
+    try:
+        from sklearn.metrics import roc_auc_score
+        return float(roc_auc_score(y, p))
+    except Exception:
+        return None
+
+def fit_logistic(X: np.ndarray, p_teacher: np.ndarray, l2: float = DISTILL_L2) -> Dict:
+    """Ridge sobre o logit do professor; devolve pesos na escala original das features."""
+    X = np.asarray(X, dtype=np.float64)
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+    Z = (X - mean) / scale
+    t = _logit(p_teacher)
+    b0 = t.mean()
+    A = Z.T @ Z + l2 * np.eye(Z.shape[1])
+    coef = np.linalg.solve(A, Z.T @ (t - b0))
+    w = coef / scale
+    return {"intercept": float(b0 - np.dot(w, mean)), "coef": w.tolist()}
+
+def predict_logistic(model: Dict, X: np.ndarray) -> np.ndarray:
+    return _sigmoid(model["intercept"] + np.asarray(X, dtype=np.float64) @ np.asarray(model["coef"]))
+
+def distill_one(tag: str, X: np.ndarray, p_teacher: np.ndarray, y: np.ndarray, valid_mask: np.ndarray) -> Dict:
+    """Ajusta no treino, reporta na validação (por jogo) o gap de AUC e a concordância."""
+    model = fit_logistic(X[~valid_mask], p_teacher[~valid_mask])
+    p_s = predict_logistic(model, X[valid_mask])
+    p_t = np.asarray(p_teacher)[valid_mask]
+    y_va = np.asarray(y)[valid_mask]
+
+    auc_t, auc_s = _auc(y_va, p_t), _auc(y_va, p_s)
+    report = {
+        "n_valid": int(valid_mask.sum()),
+        "auc_teacher": auc_t,
+        "auc_student": auc_s,
+        "auc_gap": (auc_t - auc_s) if auc_t is not None and auc_s is not None else None,
+        "agreement": float(np.mean((p_s >= DISTILL_THR) == (p_t >= DISTILL_THR))) if len(p_t) else None,
+        "agreement_thr": DISTILL_THR,
+        "mae": float(np.mean(np.abs(p_s - p_t))) if len(p_t) else None,
+    }
+    fmt = lambda v: "n/a" if v is None else f"{v:.4f}"
+    print(f"[distill:{tag}] AUC lgbm={fmt(auc_t)} logit={fmt(auc_s)} gap={fmt(report['auc_gap'])}  "
+          f"concordância@{DISTILL_THR:.2f}={fmt(report['agreement'])}  MAE={fmt(report['mae'])}")
+    model["report"] = report
+    return model
+
+def save_distilled(path: str, feature_names: List[str], models: Dict[str, Dict]):
+    obj = {"type": "logistic", "feature_names": list(feature_names)}
+    obj.update(models)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,193 @@
+# src/ml/drift.py
+# Monitor de drift em streaming: histogramas com decaimento exponencial (memória constante)
+# para cada feature e para p_ht/p_ft, comparados com o perfil de referência salvo no treino.
+# Atualização O(features) por amostra; nenhum histórico de requisições é guardado.
+
+import os, json, threading
+from typing import Dict, List, Sequence
+import numpy as np
+
+DRIFT_REF_FILE = "drift_ref.json"
+N_BINS         = int(os.environ.get("DRIFT_BINS", "10"))
+PROFILE_ROWS   = int(os.environ.get("DRIFT_PROFILE_ROWS", "200000"))
+PSI_ALERT      = float(os.environ.get("DRIFT_PSI_ALERT", "0.25"))
+EPS            = 1e-4
+
+# ====================== PERFIL (treino) =====================
+def column_profile(v: np.ndarray, n_bins: int = N_BINS) -> Dict:
+    v = np.asarray(v, dtype=np.float64)
+    v = v[np.isfinite(v)]
+    if len(v) == 0:
+        return {"edges": [], "ref": [1.0], "mean": 0.0, "std": 0.0, "zero_frac": 0.0}
+    # cortes por quantis (features de contagem repetem valores -> dedup)
+    qs = np.quantile(v, np.linspace(0, 1, n_bins + 1)[1:-1])
+    edges = np.unique(qs)
+    idx = np.searchsorted(edges, v, side="right")
+    ref = np.bincount(idx, minlength=len(edges) + 1) / len(v)
+    return {
+        "edges": edges.tolist(),
+        "ref": ref.tolist(),
+        "mean": float(v.mean()),
+        "std": float(v.std()),
+        "zero_frac": float((v == 0).mean()),
+    }
+
+def build_profile(X: np.ndarray, feature_names: List[str], outputs: Dict[str, np.ndarray]) -> Dict:
+    """
+    Perfil de referência: histograma por quantis de cada feature e de cada saída.
+    Guarda a faixa de 'minute' do treino: o monitor só compara requisições dentro dela.
+    """
+    minute_range = None
+    if "minute" in feature_names and len(X):
+        m = X[:, feature_names.index("minute")]
+        minute_range = [float(m.min()), float(m.max())]
+    if len(X) > PROFILE_ROWS:
+        sel = np.random.default_rng(0).choice(len(X), PROFILE_ROWS, replace=False)
+        X = X[sel]
+        outputs = {k: np.asarray(v)[sel] for k, v in outputs.items()}
+    return {
+        "n": int(len(X)),
+        "minute_range": minute_range,
+        "features": {n: column_profile(X[:, j]) for j, n in enumerate(feature_names)},
+        "outputs": {k: column_profile(v) for k, v in outputs.items()},
+    }
+
+def save_profile(path: str, profile: Dict):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+
+def load_profile(path: str):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def psi(live: np.ndarray, ref: np.ndarray) -> float:
+    a = np.maximum(live, EPS)
+    e = np.maximum(ref, EPS)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+# ====================== SKETCH (servidor) ===================
+class _Sketch:
+    """Histograma + soma + fração de zeros; os pesos (decaimento) vêm da _Window."""
+
+    def __init__(self, edges: Sequence[float]):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.float64)
+        self.s1 = self.zeros = 0.0
+
+    def add(self, v: float, w: float):
+        self.counts[int(np.searchsorted(self.edges, v, side="right"))] += w
+        self.s1 += w * v
+        if v == 0:
+            self.zeros += w
+
+    def scale(self, f: float):
+        self.counts *= f
+        self.s1 *= f; self.zeros *= f
+
+class _Window:
+    """
+    Um conjunto de sketches com a mesma meia-vida.
+    Em vez de decair tudo a cada amostra, o peso da amostra nova cresce (w *= g) e o
+    conjunto é renormalizado só quando w fica grande -> O(features) por atualização.
+    """
+
+    def __init__(self, profile: Dict, halflife: float):
+        self.halflife = float(halflife)
+        self.growth = 2.0 ** (1.0 / self.halflife)
+        self.w = 1.0
+        self.total = 0.0
+        self.n = 0
+        self.features = {k: _Sketch(p["edges"]) for k, p in profile["features"].items()}
+        self.outputs = {k: _Sketch(p["edges"]) for k, p in profile["outputs"].items()}
+
+    def _renorm(self):
+        f = 1.0 / self.w
+        for sk in list(self.features.values()) + list(self.outputs.values()):
+            sk.scale(f)
+        self.total *= f
+        self.w = 1.0
+
+    def update(self, feats: Dict[str, float], outs: Dict[str, float]):
+        self.w *= self.growth
+        if self.w > 1e12:
+            self._renorm()
+        w = self.w
+        for k, sk in self.features.items():
+            sk.add(float(feats.get(k, 0.0)), w)
+        for k, sk in self.outputs.items():
+            if k in outs:
+                sk.add(float(outs[k]), w)
+        self.total += w
+        self.n += 1
+
+    def _score(self, sk: _Sketch, ref: Dict, total: float) -> Dict:
+        if total <= 0:
+            return {"psi": 0.0, "mean": None, "mean_shift": 0.0,
+                    "zero_frac": None, "ref_zero_frac": ref["zero_frac"]}
+        mean = sk.s1 / total
+        std = ref["std"] if ref["std"] > 0 else 1.0
+        return {
+            "psi": round(psi(sk.counts / total, np.asarray(ref["ref"])), 4),
+            "mean": round(mean, 4),
+            "mean_shift": round((mean - ref["mean"]) / std, 4),   # em desvios-padrão do treino
+            "zero_frac": round(sk.zeros / total, 4),
+            "ref_zero_frac": round(ref["zero_frac"], 4),
+        }
+
+    def report(self, profile: Dict) -> Dict:
+        feats = {k: self._score(sk, profile["features"][k], self.total) for k, sk in self.features.items()}
+        outs = {k: self._score(sk, profile["outputs"][k], sk.counts.sum()) for k, sk in self.outputs.items()}
+        n_eff = self.total / self.w   # soma dos pesos em unidades da amostra mais recente
+        return {
+            "halflife": self.halflife,
+            "n_seen": self.n,
+            "n_eff": round(n_eff, 1),
+            "features": feats,
+            "outputs": outs,
+            "alerts": sorted(k for k, r in list(feats.items()) + list(outs.items()) if r["psi"] >= PSI_ALERT),
+        }
+
+class DriftMonitor:
+    """Janelas deslizantes (meias-vidas em nº de amostras) sobre o perfil de referência."""
+
+    def __init__(self, profile: Dict, halflives: Sequence[float]):
+        self.profile = profile
+        self.windows = [_Window(profile, h) for h in halflives]
+        self.lock = threading.Lock()
+        # fora da faixa de minutos do treino (ex.: > FT_MAX_MINUTE, intervalo) não entra na comparação
+        self.minute_range = profile.get("minute_range")
+        self.skipped = 0
+
+    @classmethod
+    def from_env(cls, models_dir: str):
+        profile = load_profile(os.path.join(models_dir, DRIFT_REF_FILE))
+        if profile is None:
+            return None
+        halflives = [float(h) for h in os.environ.get("DRIFT_HALFLIVES", "200,2000").split(",") if h]
+        return cls(profile, halflives)
+
+    def in_range(self, feats: Dict[str, float]) -> bool:
+        if not self.minute_range:
+            return True
+        m = float(feats.get("minute", 0.0))
+        return self.minute_range[0] <= m <= self.minute_range[1]
+
+    def update(self, feats: Dict[str, float], outs: Dict[str, float]):
+        with self.lock:
+            if not self.in_range(feats):
+                self.skipped += 1
+                return
+            for win in self.windows:
+                win.update(feats, outs)
+
+    def report(self) -> Dict:
+        with self.lock:
+            return {
+                "psi_alert": PSI_ALERT,
+                "ref_n": self.profile.get("n"),
+                "minute_range": self.minute_range,
+                "skipped_out_of_range": self.skipped,
+                "windows": [win.report(self.profile) for win in self.windows],
+            }
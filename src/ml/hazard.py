@@ -0,0 +1,86 @@
+# src/ml/hazard.py
+# Modelo único para todos os horizontes: g(x_m, L) = P(gol em (m, m+L] | features no minuto m).
+# L (minutos à frente) é uma feature; HT usa L = 45-m, FT usa L = 90-m, janela k usa L = k.
+# Uma linha por horizonte pedido: 2 + nº de janelas por jogo, independente do minuto.
+# Compartilhado por treino, servidores e calibração.
+
+import os, json
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+
+HAZARD_MODEL_FILE = "hazard_lgbm.txt"
+HORIZONS_FILE     = "horizons.json"
+TIME_FEATURE      = "horizon_min"  # L = minutos à frente (monotônica crescente no treino)
+HT_END            = 45
+FT_END            = 90
+
+def model_type(models_dir: str) -> str:
+    """
+    'split' (ht_lgbm + ft_lgbm) ou 'hazard' (hazard_lgbm).
+    Vem do que o treino gravou em horizons.json; MODEL_TYPE no env só sobrescreve.
+    """
+    t = os.environ.get("MODEL_TYPE", "").strip().lower()
+    if not t:
+        path = os.path.join(models_dir, HORIZONS_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                t = str(json.load(f).get("model_type") or "split").lower()
+        except FileNotFoundError:
+            t = "split"   # artefatos antigos (antes do hazard)
+    if t not in ("split", "hazard"):
+        raise ValueError(f"MODEL_TYPE inválido: {t}")
+    return t
+
+def check_booster(bst, n_features: int):
+    """Modelo salvo com TIME_FEATURE como última coluna; artefatos antigos (por minuto) pedem retreino."""
+    names = list(bst.feature_name())
+    if len(names) != n_features + 1 or names[-1] != TIME_FEATURE:
+        raise RuntimeError(f"{HAZARD_MODEL_FILE} incompatível (esperado {n_features}+'{TIME_FEATURE}', "
+                           f"veio {len(names)} com '{names[-1] if names else ''}'); retreine com TRAIN_TARGET=hazard.")
+
+def horizon_lengths(minutes: Sequence[float], windows: Sequence[int] = ()) -> np.ndarray:
+    """L por linha e horizonte (colunas: HT, FT, janelas); janelas param no fim do jogo; <= 0 = sem horizonte."""
+    m = np.asarray(minutes, dtype=np.float64)
+    ft = FT_END - m
+    cols = [HT_END - m, ft] + [np.minimum(float(k), ft) for k in windows]
+    return np.column_stack(cols) if len(m) else np.zeros((0, len(cols)))
+
+def with_horizon(X: np.ndarray, L: Sequence[float]) -> np.ndarray:
+    """Acrescenta TIME_FEATURE (L) a cada linha de X."""
+    X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+    out = np.empty((len(X), X.shape[1] + 1), dtype=np.float32)
+    out[:, :-1] = X
+    out[:, -1] = np.asarray(L, dtype=np.float32)
+    return out
+
+def predict_horizons(bst, X: np.ndarray, minute_idx: int, windows: Sequence[int] = ()):
+    """
+    (p_ht, p_ft, {k: P(gol em (m, m+k])}) para cada linha de X, com UMA chamada de predict
+    sobre n x (2 + len(windows)) linhas; horizonte já encerrado (L <= 0) vale 0.
+    minute_idx = índice da feature 'minute'.
+    """
+    X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+    L = horizon_lengths(X[:, minute_idx], windows)
+    p = np.zeros(L.shape, dtype=np.float64)
+    ok = L > 0
+    if ok.any():
+        rows = np.repeat(np.arange(len(X)), L.shape[1])[ok.ravel()]
+        p[ok] = np.clip(bst.predict(with_horizon(X[rows], L[ok])), 0.0, 1.0)
+    p_win = {int(k): p[:, 2 + j] for j, k in enumerate(windows)}
+    return p[:, 0], p[:, 1], p_win
+
+def predict_ht_ft(bst, X: np.ndarray, minute_idx: int) -> List[np.ndarray]:
+    """(p_ht, p_ft) para cada linha de X; minute_idx = índice da feature 'minute'."""
+    p_ht, p_ft, _ = predict_horizons(bst, X, minute_idx)
+    return [p_ht, p_ft]
+
+def load_windows(models_dir: str) -> Tuple[List[int], Dict[int, str]]:
+    """Janelas extras (minutos) e arquivos dos boosters por janela, de horizons.json."""
+    path = os.path.join(models_dir, HORIZONS_FILE)
+    if not os.path.exists(path):
+        return [], {}
+    with open(path, "r", encoding="utf-8") as f:
+        obj = json.load(f)
+    windows = [int(k) for k in obj.get("windows") or []]
+    files = {int(k): os.path.join(models_dir, v) for k, v in (obj.get("models") or {}).items()}
+    return windows, files
@@ -1,15 +1,20 @@
 # src/ml/serve_goal_half.py
-import os, json
+import os, json, asyncio
 from typing import List, Dict
 import numpy as np
 import lightgbm as lgb
-from fastapi import FastAPI, Body
+from fastapi import FastAPI, Body, HTTPException
 import uvicorn
+import hazard
+import drift
+import admission
 
 ROOT       = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MODELS_DIR = os.environ.get("MODELS_DIR", os.path.join(ROOT, "..", "models"))
 HT_MODEL   = os.path.join(MODELS_DIR, "ht_lgbm.txt")
 FT_MODEL   = os.path.join(MODELS_DIR, "ft_lgbm.txt")
+HAZ_MODEL  = os.path.join(MODELS_DIR, hazard.HAZARD_MODEL_FILE)
+MODEL_TYPE = hazard.model_type(MODELS_DIR)
 FNAMES     = os.path.join(MODELS_DIR, "feature_names.json")
 
 def load_booster_utf8(path: str) -> lgb.Booster:
@@ -39,30 +44,120 @@ def load_feature_names(path: str) -> List[str]:
             seen.add(n); out.append(n)
     return out
 
-bst_ht = load_booster_utf8(HT_MODEL)
-bst_ft = load_booster_utf8(FT_MODEL)
 FEATURE_NAMES = load_feature_names(FNAMES)
 N = len(FEATURE_NAMES)
-if bst_ht.num_feature()!=N or bst_ft.num_feature()!=N:
-    raise RuntimeError(f"n_features mismatch: file={N} ht={bst_ht.num_feature()} ft={bst_ft.num_feature()}")
+if MODEL_TYPE == "hazard":
+    bst_hz = load_booster_utf8(HAZ_MODEL)
+    MINUTE_IDX = FEATURE_NAMES.index("minute")
+    hazard.check_booster(bst_hz, N)
+else:
+    bst_ht = load_booster_utf8(HT_MODEL)
+    bst_ft = load_booster_utf8(FT_MODEL)
+    if bst_ht.num_feature()!=N or bst_ft.num_feature()!=N:
+        raise RuntimeError(f"n_features mismatch: file={N} ht={bst_ht.num_feature()} ft={bst_ft.num_feature()}")
+
+# janelas "gol nos próximos k min" (horizons.json); no modo hazard não precisam de boosters
+WINDOWS, WIN_FILES = hazard.load_windows(MODELS_DIR)
+bst_win = {} if MODEL_TYPE == "hazard" else {k: load_booster_utf8(f) for k, f in WIN_FILES.items()}
+WINDOWS = [k for k in WINDOWS if MODEL_TYPE == "hazard" or k in bst_win]
+
+def predict_matrix(X: np.ndarray):
+    """(p_ht, p_ft, {k: p_win}) para cada linha de X; no modo hazard sai de um único predict."""
+    if MODEL_TYPE == "hazard":
+        return hazard.predict_horizons(bst_hz, X, MINUTE_IDX, WINDOWS)
+    return bst_ht.predict(X), bst_ft.predict(X), {k: bst_win[k].predict(X) for k in WINDOWS}
+
+# monitor de drift (opcional: precisa do drift_ref.json gerado no treino)
+monitor = drift.DriftMonitor.from_env(MODELS_DIR)
+
+def observe(feats_list: List[Dict], p_ht: np.ndarray, p_ft: np.ndarray):
+    if monitor is None:
+        return
+    for f, ph, pf in zip(feats_list, p_ht, p_ft):
+        monitor.update(f, {"p_ht": float(ph), "p_ft": float(pf)})
+
+# admissão: prioridade + deadline por requisição, em vez de FIFO
+queue = admission.AdmissionQueue()
+
+async def admit(payload: Dict, fn):
+    """
+    Roda fn na fila de admissão sem prender thread do event loop nem do pool do anyio:
+    o worker resolve um future; 503 rápido se não der para cumprir o deadline.
+    """
+    loop = asyncio.get_running_loop()
+    fut = loop.create_future()
+
+    def resolve(_job):
+        loop.call_soon_threadsafe(lambda: fut.done() or fut.set_result(None))
+
+    deadline = payload.get("deadline_ms")
+    try:
+        job = queue.submit(fn, int(payload.get("priority") or 0),
+                           float(deadline) if deadline is not None else None, resolve)
+        try:
+            await asyncio.wait_for(asyncio.shield(fut), queue.remaining(job))
+        except asyncio.TimeoutError:
+            queue.cancel(job)       # False = terminou no limite; usa o resultado
+        if job.error is not None:
+            raise job.error
+        return job.result
+    except admission.Rejected as e:
+        raise HTTPException(status_code=503, detail=e.reason)
+
+def vectorize(feats: Dict) -> np.ndarray:
+    return np.array([float(feats.get(n, 0.0)) for n in FEATURE_NAMES], dtype=np.float32)
 
 app = FastAPI()
 
 @app.get("/health")
 def health():
-    return {"ok": True, "n_features": N}
+    return {"ok": True, "n_features": N, "model_type": MODEL_TYPE, "windows": WINDOWS}
+
+@app.get("/drift")
+def drift_report():
+    """PSI / deslocamento de média / fração de zeros por feature e por saída, por janela."""
+    if monitor is None:
+        raise HTTPException(status_code=404, detail="drift_ref.json não encontrado; treine antes.")
+    return monitor.report()
+
+@app.get("/stats")
+def stats():
+    """Fila de admissão: profundidade, espera/serviço (ms), servidas/expiradas/descartadas."""
+    return queue.snapshot()
 
 @app.post("/predict")
-def predict(payload: Dict = Body(...)):
+async def predict(payload: Dict = Body(...)):
     """
-    Espera: {"features": {name:value,...}}
-    Retorna: {"p_ht": float, "p_ft": float}
+    Espera: {"features": {name:value,...}}  ou  {"batch": [{...}, ...]}
+            opcional: "priority" (int, maior = antes), "deadline_ms" (orçamento; 503 se estourar)
+    Retorna: {"p_ht": float, "p_ft": float, "p_win": {"5": float, ...}}
+             (batch: listas, uma posição por item)
     """
+    # vetorização, predict e drift rodam no worker da admissão (fora do event loop)
+    if isinstance(payload.get("batch"), list):
+        batch = [f or {} for f in payload["batch"]]
+
+        def job():
+            xs = np.vstack([vectorize(f) for f in batch]) if batch else np.zeros((0, N), dtype=np.float32)
+            out = predict_matrix(xs)
+            observe(batch, out[0], out[1])
+            return out
+
+        p_ht, p_ft, p_win = await admit(payload, job)
+        return {"p_ht": p_ht.tolist(), "p_ft": p_ft.tolist(),
+                "p_win": {str(k): v.tolist() for k, v in p_win.items()}}
+    if "features" not in payload:
+        raise HTTPException(status_code=400, detail="payload deve conter 'features' ou 'batch'.")
     feats = payload.get("features") or {}
-    x = np.array([float(feats.get(n, 0.0)) for n in FEATURE_NAMES], dtype=np.float32)
-    p_ht = float(bst_ht.predict(x[None, :])[0])
-    p_ft = float(bst_ft.predict(x[None, :])[0])
-    return {"p_ht": p_ht, "p_ft": p_ft}
+
+    def job():
+        out = predict_matrix(vectorize(feats)[None, :])
+        observe([feats], out[0], out[1])
+        return out
+
+    p_ht, p_ft, p_win = await admit(payload, job)
+    return {"p_ht": float(p_ht[0]), "p_ft": float(p_ft[0]),
+            "p_win": {str(k): float(v[0]) for k, v in p_win.items()}}
 
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=int(os.environ.get("ML_PORT", "8009")))
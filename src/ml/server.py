@@ -1,5 +1,5 @@
 # src/ml/server.py
-# Flask server: recebe {"features": {...}} e retorna {"p_ht": float, "p_ft": float}
+# Flask server: recebe {"features": {...}} e retorna {"p_ht": float, "p_ft": float, "p_win": {...}}
 # Usa os modelos LightGBM treinados em models/.
 
 import os, json
@@ -7,27 +7,70 @@ from pathlib import Path
 from flask import Flask, request, jsonify
 import numpy as np
 import lightgbm as lgb
+import hazard
+import drift
+import admission
 
 MODEL_DIR = Path(os.environ.get("MODEL_DIR", "models"))
 FN_HT = MODEL_DIR / "ht_lgbm.txt"
 FN_FT = MODEL_DIR / "ft_lgbm.txt"
+FN_HAZ = MODEL_DIR / hazard.HAZARD_MODEL_FILE
 FN_META = MODEL_DIR / "feature_names.json"
+MODEL_TYPE = hazard.model_type(str(MODEL_DIR))
 
 app = Flask(__name__)
 
 bst_ht = None
 bst_ft = None
+bst_hz = None
+bst_win = {}
+windows = []
 feat_names = None
+monitor = None
+# admissão: prioridade + deadline por requisição, em vez de FIFO
+queue = admission.AdmissionQueue()
 
 def load_models():
-    global bst_ht, bst_ft, feat_names
-    if not FN_HT.exists() or not FN_FT.exists() or not FN_META.exists():
+    global bst_ht, bst_ft, bst_hz, bst_win, windows, feat_names, monitor
+    needed = [FN_HAZ] if MODEL_TYPE == "hazard" else [FN_HT, FN_FT]
+    if not all(f.exists() for f in needed) or not FN_META.exists():
         raise FileNotFoundError("Modelos/feature_names não encontrados em 'models/'. Treine antes.")
 
-    bst_ht = lgb.Booster(model_file=str(FN_HT))
-    bst_ft = lgb.Booster(model_file=str(FN_FT))
+    if MODEL_TYPE == "hazard":
+        bst_hz = lgb.Booster(model_file=str(FN_HAZ))
+    else:
+        bst_ht = lgb.Booster(model_file=str(FN_HT))
+        bst_ft = lgb.Booster(model_file=str(FN_FT))
     feat_names = json.loads(FN_META.read_text(encoding="utf-8"))["feature_names"]
-    app.logger.info("Modelos carregados.")
+    if bst_hz is not None:
+        hazard.check_booster(bst_hz, len(feat_names))
+
+    # janelas "gol nos próximos k min" (horizons.json); hazard não precisa de boosters extras
+    windows, win_files = hazard.load_windows(str(MODEL_DIR))
+    if MODEL_TYPE != "hazard":
+        bst_win = {k: lgb.Booster(model_file=f) for k, f in win_files.items()}
+        windows = [k for k in windows if k in bst_win]
+    # monitor de drift (opcional: precisa do drift_ref.json gerado no treino)
+    monitor = drift.DriftMonitor.from_env(str(MODEL_DIR))
+    app.logger.info(f"Modelos carregados ({MODEL_TYPE}, janelas={windows}, drift={'on' if monitor else 'off'}).")
+
+def observe(feats_list, p_ht, p_ft):
+    if monitor is None:
+        return
+    for f, ph, pf in zip(feats_list, p_ht, p_ft):
+        monitor.update(f, {"p_ht": float(ph), "p_ft": float(pf)})
+
+def predict_matrix(xs):
+    # hazard: um único predict gera p_ht, p_ft e todas as janelas
+    if MODEL_TYPE == "hazard":
+        return hazard.predict_horizons(bst_hz, xs, feat_names.index("minute"), windows)
+    return bst_ht.predict(xs), bst_ft.predict(xs), {k: bst_win[k].predict(xs) for k in windows}
+
+def admit(data: dict, fn):
+    # levanta admission.Rejected (-> 503) se não der para cumprir o deadline
+    deadline = data.get("deadline_ms")
+    return queue.run(fn, int(data.get("priority") or 0),
+                     float(deadline) if deadline is not None else None)
 
 def vectorize(feats: dict):
     # alinha na ordem dos nomes de features
@@ -37,19 +80,37 @@ def vectorize(feats: dict):
 @app.route("/predict", methods=["POST"])
 def predict():
     data = request.get_json(silent=True) or {}
+    try:
+        return _predict(data)
+    except admission.Rejected as e:
+        return jsonify(error=e.reason), 503
+
+def _predict(data: dict):
     if "features" in data:
         x = vectorize(data["features"])
-        p_ht = float(bst_ht.predict(x)[0])
-        p_ft = float(bst_ft.predict(x)[0])
-        return jsonify(dict(p_ht=p_ht, p_ft=p_ft))
+        p_ht, p_ft, p_win = admit(data, lambda: predict_matrix(x))
+        observe([data["features"]], p_ht, p_ft)
+        p_win = {str(k): float(v[0]) for k, v in p_win.items()}
+        return jsonify(dict(p_ht=float(p_ht[0]), p_ft=float(p_ft[0]), p_win=p_win))
     elif "batch" in data and isinstance(data["batch"], list):
         xs = np.vstack([vectorize(f) for f in data["batch"]])
-        p_ht = bst_ht.predict(xs).tolist()
-        p_ft = bst_ft.predict(xs).tolist()
-        return jsonify(dict(p_ht=p_ht, p_ft=p_ft))
+        p_ht, p_ft, p_win = admit(data, lambda: predict_matrix(xs))
+        observe(data["batch"], p_ht, p_ft)
+        p_win = {str(k): v.tolist() for k, v in p_win.items()}
+        return jsonify(dict(p_ht=p_ht.tolist(), p_ft=p_ft.tolist(), p_win=p_win))
     else:
         return jsonify(error="payload deve conter 'features' ou 'batch'."), 400
 
+@app.route("/stats", methods=["GET"])
+def stats():
+    return jsonify(queue.snapshot())
+
+@app.route("/drift", methods=["GET"])
+def drift_report():
+    if monitor is None:
+        return jsonify(error="drift_ref.json não encontrado; treine antes."), 404
+    return jsonify(monitor.report())
+
 if __name__ == "__main__":
     load_models()
     host = os.environ.get("ML_HOST","127.0.0.1")
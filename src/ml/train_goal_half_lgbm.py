@@ -1,8 +1,12 @@
 # src/ml/train_goal_half_lgbm.py
-import os, json, sqlite3, random, time
+import os, json, sqlite3, random, time, bisect
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple
 import numpy as np
 import lightgbm as lgb
+import hazard
+import drift
+import distill
 
 # ====================== PATHS & PARAMS ======================
 ROOT       = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -11,15 +15,34 @@ MODELS_DIR = os.environ.get("MODELS_DIR", os.path.join(ROOT, "..", "models"))
 
 HT_MODEL   = os.path.join(MODELS_DIR, "ht_lgbm.txt")
 FT_MODEL   = os.path.join(MODELS_DIR, "ft_lgbm.txt")
+HAZ_MODEL  = os.path.join(MODELS_DIR, hazard.HAZARD_MODEL_FILE)
 FNAMES     = os.path.join(MODELS_DIR, "feature_names.json")
+HORIZONS_JSON = os.path.join(MODELS_DIR, hazard.HORIZONS_FILE)
+DRIFT_REF  = os.path.join(MODELS_DIR, drift.DRIFT_REF_FILE)
+DISTILLED  = os.path.join(MODELS_DIR, distill.DISTILLED_FILE)
+
+# "split" = dois boosters (HT/FT); "hazard" = um único modelo de hazard por minuto
+TRAIN_TARGET = os.environ.get("TRAIN_TARGET", "split").strip().lower()
 
 LOOKBACK_MIN  = int(os.environ.get("PRESS_LOOKBACK_MIN", "6"))
 HT_MAX_MINUTE = int(os.environ.get("HT_MAX_MINUTE", "35"))
 FT_MAX_MINUTE = int(os.environ.get("FT_MAX_MINUTE", "80"))
 
+# janelas extras "gol nos próximos k minutos" (ex.: "5,10,15,20"); HT/FT sempre entram
+HORIZONS = [int(k) for k in os.environ.get("HORIZONS", "").replace(" ", "").split(",") if k]
+# nº de modelos treinados em paralelo (threads do LightGBM são divididas entre eles)
+HORIZON_WORKERS = int(os.environ.get("HORIZON_WORKERS", "0")) or None
+
 # pesos (positivos mais “caros” para aumentar seletividade)
 HT_POS_WEIGHT = float(os.environ.get("HT_POS_WEIGHT", "5.0"))
 FT_POS_WEIGHT = float(os.environ.get("FT_POS_WEIGHT", "7.0"))
+WIN_POS_WEIGHT = float(os.environ.get("WIN_POS_WEIGHT", "1.0"))
+# hazard: sem reponderação (a mesma saída serve HT, FT e janelas)
+HAZARD_POS_WEIGHT = float(os.environ.get("HAZARD_POS_WEIGHT", "1.0"))
+# hazard: usa 1 a cada N minutos de observação
+HAZARD_STRIDE     = int(os.environ.get("HAZARD_STRIDE", "1"))
+# hazard: horizontes L sorteados por origem, além de HT/FT/HORIZONS (cobre janelas arbitrárias)
+HAZARD_SAMPLES    = int(os.environ.get("HAZARD_SAMPLES", "2"))
 
 # LightGBM hparams
 LEARNING_RATE   = float(os.environ.get("LGBM_LR", "0.02"))
@@ -62,27 +85,40 @@ def q_ticks(conn, event_id: str) -> List[sqlite3.Row]:
     return cur.fetchall()
 
 # ====================== LABELS ==============================
-def goal_between(rows: List[sqlite3.Row], start_min: int, end_min: int) -> int:
-    """1 se houve incremento de gols no intervalo (start_min, end_min], senão 0."""
-    g_start = None
-    for r in reversed(rows):
-        m = r["minute"] or 0
-        if m <= start_min:
-            g_start = (r["goals_home"] or 0) + (r["goals_away"] or 0)
-            break
-    if g_start is None:
-        g_start = 0
-
+def goal_minutes(rows: List[sqlite3.Row]) -> List[int]:
+    """Minutos em que o total de gols aumentou (mesma regra de calibrate_thresholds.py)."""
+    mins = []
+    prev = None
     for r in rows:
-        m = r["minute"] or 0
-        if m <= start_min:
-            continue
-        if m > end_min:
-            break
         g = (r["goals_home"] or 0) + (r["goals_away"] or 0)
-        if g > g_start:
-            return 1
-    return 0
+        if prev is not None and g > prev:
+            mins.append(int(r["minute"] or 0))
+        prev = g
+    return sorted(set(mins))
+
+def first_goal_after(goal_mins: List[int], start_min: int):
+    """Primeiro gol em minuto > start_min (goal_mins ordenado), ou None."""
+    i = bisect.bisect_right(goal_mins, start_min)
+    return goal_mins[i] if i < len(goal_mins) else None
+
+# horizonte = (nome, fim_fixo, janela_relativa, minuto_max_de_entrada)
+# label = 1 se há gol em (m, fim], fim = fim_fixo ou m + janela_relativa
+def make_horizons(windows: List[int]) -> List[Tuple[str, int, int, int]]:
+    hs = [("HT", 45, 0, HT_MAX_MINUTE), ("FT", 90, 0, FT_MAX_MINUTE)]
+    for k in sorted(set(windows)):
+        hs.append((f"W{k}", 0, k, FT_MAX_MINUTE))
+    return hs
+
+def label_row(first_goal, minute: int, horizons) -> List[int]:
+    """Linha da matriz de labels; -1 = minuto fora da faixa de entrada do horizonte."""
+    out = []
+    for _, end_fixed, win, max_min in horizons:
+        if minute > max_min:
+            out.append(-1)
+            continue
+        end = end_fixed or (minute + win)
+        out.append(int(first_goal is not None and first_goal <= end))
+    return out
 
 # ====================== FEATURES (compatível com calibrate_thresholds.py) ===
 def _getf(row: sqlite3.Row, key: str) -> float:
@@ -155,44 +191,97 @@ def to_vector(fdict: Dict[str, float], feature_names: List[str]) -> np.ndarray:
     return np.array([float(fdict.get(name, 0.0)) for name in feature_names], dtype=np.float32)
 
 # ====================== DATASET BUILD =======================
-def build_dataset(conn, target: str):
+def build_dataset(conn, horizons):
     """
-    target: "HT" ou "FT"
-    - HT: label = gol até 45'; usa minutos 0..HT_MAX_MINUTE
-    - FT: label = gol até 90'; usa minutos 0..FT_MAX_MINUTE
+    Uma passada por jogo: features de cada minuto + matriz de labels (n x horizontes).
+    - HT: gol até 45'; minutos 0..HT_MAX_MINUTE
+    - FT: gol até 90'; minutos 0..FT_MAX_MINUTE
+    - Wk: gol em (m, m+k]; minutos 0..FT_MAX_MINUTE
+    Labels saem do índice de minutos de gol do jogo (bisect), sem varrer os ticks por amostra.
     """
     events = q_events(conn)
     random.shuffle(events)
+    max_minute = max(h[3] for h in horizons)
 
-    X, y, gids = [], [], []  # gids = event_id por amostra
+    X, Y, gids = [], [], []  # gids = event_id por amostra
     n_events = len(events)
 
     for i, eid in enumerate(events, 1):
         rows = q_ticks(conn, eid)
         if not rows: continue
 
+        gm = goal_minutes(rows)
         minutes = sorted(set(int(r["minute"]) for r in rows if r["minute"] is not None))
         for m in minutes:
-            if target == "HT" and m > HT_MAX_MINUTE: continue
-            if target == "FT" and m > FT_MAX_MINUTE: continue
+            if m > max_minute: continue
 
             fdict = build_feature_dict(rows, m)
             if not fdict: continue
 
-            x = to_vector(fdict, FEATURE_ORDER)
-            label = goal_between(rows, m, 45 if target=="HT" else 90)
-
-            X.append(x)
-            y.append(int(label))
+            X.append(to_vector(fdict, FEATURE_ORDER))
+            Y.append(label_row(first_goal_after(gm, m), m, horizons))
             gids.append(eid)
 
         if i % 200 == 0:
-            print(f"[train] {i}/{n_events}  {target}_samples={len(X)}")
+            print(f"[train] {i}/{n_events}  samples={len(X)}")
 
     X = np.vstack(X) if X else np.zeros((0, len(FEATURE_ORDER)), dtype=np.float32)
-    y = np.asarray(y, dtype=np.int8)
+    Y = np.asarray(Y, dtype=np.int8).reshape(len(X), len(horizons))
     gids = np.asarray(gids)
-    return X, y, gids
+    return X, Y, gids
+
+def build_hazard_dataset(conn):
+    """
+    Dataset "gol em (m, m+L]" com L (TIME_FEATURE) como feature -> um único modelo para HT, FT e janelas:
+    - origem m (<= FT_MAX_MINUTE, 1 a cada HAZARD_STRIDE minutos)
+    - por origem, uma linha por L em {45-m, 90-m, HORIZONS} + HAZARD_SAMPLES L sorteados em 1..90-m
+    - label = 1 se o primeiro gol após m cai em (m, m+L]
+    Devolve (X, y, gids) e as origens (X0, Y0 = labels HT/FT, g0) para drift/destilação.
+    """
+    feat_names = FEATURE_ORDER + [hazard.TIME_FEATURE]
+    ht_ft = make_horizons([])
+    rng = np.random.default_rng(SEED)
+    events = q_events(conn)
+    random.shuffle(events)
+
+    X, y, gids = [], [], []
+    X0, Y0, g0 = [], [], []
+    n_events = len(events)
+
+    for i, eid in enumerate(events, 1):
+        rows = q_ticks(conn, eid)
+        if not rows: continue
+
+        gm = goal_minutes(rows)
+        minutes = sorted(set(int(r["minute"]) for r in rows if r["minute"] is not None))
+        origins = [m for m in minutes if m <= FT_MAX_MINUTE][::max(1, HAZARD_STRIDE)]
+        for m in origins:
+            left = hazard.FT_END - m
+            if left <= 0: continue
+            fdict = build_feature_dict(rows, m)
+            if not fdict: continue
+
+            g = first_goal_after(gm, m)
+            Ls = [hazard.HT_END - m, left] + HORIZONS + list(rng.integers(1, left + 1, HAZARD_SAMPLES))
+            Ls = sorted(set(int(L) for L in Ls if 0 < L <= left))
+
+            x = to_vector(fdict, FEATURE_ORDER)
+            X.append(hazard.with_horizon(np.repeat(x[None, :], len(Ls), axis=0), Ls))
+            y.append(np.array([g is not None and g <= m + L for L in Ls], dtype=np.int8))
+            gids.extend([eid] * len(Ls))
+
+            X0.append(x)
+            Y0.append(label_row(g, m, ht_ft))
+            g0.append(eid)
+
+        if i % 200 == 0:
+            print(f"[train] {i}/{n_events}  HAZARD_rows={len(gids)}  origens={len(g0)}")
+
+    X = np.vstack(X) if X else np.zeros((0, len(feat_names)), dtype=np.float32)
+    y = np.concatenate(y) if y else np.zeros(0, dtype=np.int8)
+    X0 = np.vstack(X0) if X0 else np.zeros((0, len(FEATURE_ORDER)), dtype=np.float32)
+    Y0 = np.asarray(Y0, dtype=np.int8).reshape(len(X0), len(ht_ft))
+    return (X, y, np.asarray(gids)), (X0, Y0, np.asarray(g0))
 
 # ====================== SPLIT (Group por jogo) ==============
 def train_valid_split_by_game(gids: np.ndarray, val_fraction=0.15, seed=42):
@@ -230,13 +319,25 @@ def make_monotone_constraints(feature_names: List[str]) -> List[int]:
                     "d_sot_home","d_sot_away","d_soff_home","d_soff_away",
                     "d_da_home","d_da_away","d_corners_home","d_corners_away"):
             cons.append(1)
-        elif name.startswith("cum_"):
+        elif name.startswith("cum_") or name == hazard.TIME_FEATURE:
             cons.append(1)
         else:
             cons.append(0)
     return cons
 
-def train_one(tag: str, X: np.ndarray, y: np.ndarray, gids: np.ndarray, pos_weight: float):
+def binned_subset(base: lgb.Dataset, rows: np.ndarray, y: np.ndarray) -> lgb.Dataset:
+    """Linhas `rows` do Dataset já binado, com labels próprios (sem rebinar os dados crus)."""
+    ds = base.subset(rows).construct()
+    ds.set_label(y)
+    return ds
+
+def train_one(tag: str, X: np.ndarray, y: np.ndarray, gids: np.ndarray, pos_weight: float,
+              feature_names: List[str] = FEATURE_ORDER, base: lgb.Dataset = None,
+              rows: np.ndarray = None, num_threads: int = 0):
+    """
+    base/rows: Dataset já binado e os índices de X nele -> treino/validação saem de base.subset;
+    sem base, os Datasets são montados a partir de X.
+    """
     if len(X) == 0:
         raise RuntimeError(f"Dataset vazio para {tag}")
 
@@ -245,11 +346,17 @@ def train_one(tag: str, X: np.ndarray, y: np.ndarray, gids: np.ndarray, pos_weig
     X_tr, y_tr = X[train_mask], y[train_mask]
     X_va, y_va = X[valid_mask], y[valid_mask]
 
-    dtr = lgb.Dataset(X_tr, label=y_tr, feature_name=FEATURE_ORDER)
-    dva = lgb.Dataset(X_va, label=y_va, feature_name=FEATURE_ORDER, reference=dtr)
+    if base is not None:
+        dtr = binned_subset(base, rows[train_mask], y_tr)
+        dva = binned_subset(base, rows[valid_mask], y_va)
+    else:
+        dtr = lgb.Dataset(X_tr, label=y_tr, feature_name=feature_names)
+        dva = lgb.Dataset(X_va, label=y_va, feature_name=feature_names, reference=dtr)
 
     params = make_params(pos_weight)
-    params["monotone_constraints"] = make_monotone_constraints(FEATURE_ORDER)
+    params["monotone_constraints"] = make_monotone_constraints(feature_names)
+    if num_threads:
+        params["num_threads"] = num_threads
 
     print(f"[train:{tag}] X_tr={X_tr.shape}  X_va={X_va.shape}  pos_weight={pos_weight}")
     # compat com versões antigas e novas do LightGBM
@@ -285,7 +392,53 @@ def train_one(tag: str, X: np.ndarray, y: np.ndarray, gids: np.ndarray, pos_weig
 
     return booster
 
+def train_horizons(horizons, X: np.ndarray, Y: np.ndarray, gids: np.ndarray) -> Dict[str, lgb.Booster]:
+    """
+    Treina um booster por coluna de Y sobre o MESMO Dataset binado, em paralelo:
+    cada horizonte usa base.subset(linhas) + seus labels, sem rebinar X.
+    """
+    # label provisório: o C++ exige label no Dataset pai; cada subset recebe o do seu horizonte
+    base = lgb.Dataset(X, label=np.zeros(len(X), dtype=np.float32), feature_name=FEATURE_ORDER,
+                       params={"verbose": -1, "min_data_in_leaf": MIN_DATA_LEAF})
+    base.construct()  # binning uma vez só (antes das threads)
+
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(HORIZON_WORKERS or cpus, len(horizons), cpus))
+    threads = max(1, cpus // workers)
+    print(f"[train] {len(horizons)} horizontes, {workers} em paralelo x {threads} threads")
+
+    def fit(j):
+        name = horizons[j][0]
+        mask = Y[:, j] >= 0
+        pw = HT_POS_WEIGHT if name == "HT" else FT_POS_WEIGHT if name == "FT" else WIN_POS_WEIGHT
+        return name, train_one(name, X[mask], Y[mask, j], gids[mask], pw,
+                               base=base, rows=np.flatnonzero(mask), num_threads=threads)
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return dict(ex.map(fit, range(len(horizons))))
+
+def horizon_model_file(name: str) -> str:
+    return {"HT": HT_MODEL, "FT": FT_MODEL}.get(name) or os.path.join(MODELS_DIR, f"{name.lower()}_lgbm.txt")
+
 # ====================== MAIN ================================
+def save_drift_profile(X: np.ndarray, p_ht: np.ndarray, p_ft: np.ndarray):
+    """Perfil de referência das features e das saídas, usado pelo monitor de drift do servidor."""
+    profile = drift.build_profile(X, FEATURE_ORDER, {"p_ht": p_ht, "p_ft": p_ft})
+    drift.save_profile(DRIFT_REF, profile)
+    print(f"[train] {os.path.basename(DRIFT_REF)} salvo (n={profile['n']}).")
+
+def save_distilled(parts: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]):
+    """
+    Fallback compacto para o Node (ml_infer.js): logístico destilado das saídas do LightGBM.
+    parts[tag] = (X, p_professor, y, gids); validação pelos mesmos jogos do treino do professor.
+    """
+    models = {}
+    for tag, (X, p, y, gids) in parts.items():
+        _, valid_mask = train_valid_split_by_game(gids, VAL_FRACTION, SEED)
+        models[tag.lower()] = distill.distill_one(tag, X, p, y, valid_mask)
+    distill.save_distilled(DISTILLED, FEATURE_ORDER, models)
+    print(f"[train] {os.path.basename(DISTILLED)} salvo.")
+
 def main():
     os.makedirs(MODELS_DIR, exist_ok=True)
     print(f"[train] salvando em: {MODELS_DIR}")
@@ -293,23 +446,69 @@ def main():
 
     conn = connect()
 
-    # monta datasets
-    X_ht, y_ht, gid_ht = build_dataset(conn, "HT")
-    X_ft, y_ft, gid_ft = build_dataset(conn, "FT")
-    print(f"[train] final: HT {X_ht.shape}, FT {X_ft.shape}")
-
-    # treinos
-    bst_ht = train_one("HT", X_ht, y_ht, gid_ht, HT_POS_WEIGHT)
-    bst_ft = train_one("FT", X_ft, y_ft, gid_ft, FT_POS_WEIGHT)
+    if TRAIN_TARGET == "hazard":
+        win_models = main_hazard(conn)
+    elif TRAIN_TARGET == "split":
+        win_models = main_split(conn)
+    else:
+        raise ValueError(f"TRAIN_TARGET inválido: {TRAIN_TARGET}")
 
-    # salva
-    bst_ht.save_model(HT_MODEL, num_iteration=bst_ht.best_iteration)
-    bst_ft.save_model(FT_MODEL, num_iteration=bst_ft.best_iteration)
-    print(f"[train] modelos salvos: {os.path.basename(HT_MODEL)}, {os.path.basename(FT_MODEL)}")
+    # tipo de modelo treinado + janelas que o servidor deve devolver (hazard: derivadas da curva);
+    # servidores/calibração leem model_type daqui, então boosters antigos do outro tipo são ignorados
+    with open(HORIZONS_JSON, "w", encoding="utf-8") as f:
+        json.dump({"model_type": TRAIN_TARGET, "windows": sorted(set(HORIZONS)), "models": win_models},
+                  f, ensure_ascii=False, indent=2)
+    print(f"[train] horizons.json salvo: model_type={TRAIN_TARGET} janelas={sorted(set(HORIZONS))}")
 
     with open(FNAMES, "w", encoding="utf-8") as f:
         json.dump(FEATURE_ORDER, f, ensure_ascii=False, indent=2)
     print("[train] feature_names.json salvo.")
 
+def main_split(conn):
+    # monta dataset (uma passada, todos os horizontes)
+    horizons = make_horizons(HORIZONS)
+    X, Y, gids = build_dataset(conn, horizons)
+    print(f"[train] final: X {X.shape}, " +
+          ", ".join(f"{h[0]}={int((Y[:, j] >= 0).sum())}" for j, h in enumerate(horizons)))
+
+    # treinos
+    boosters = train_horizons(horizons, X, Y, gids)
+
+    # salva
+    win_models = {}
+    for name, bst in boosters.items():
+        path = horizon_model_file(name)
+        bst.save_model(path, num_iteration=bst.best_iteration)
+        if name.startswith("W"):
+            win_models[name[1:]] = os.path.basename(path)
+    print("[train] modelos salvos: " + ", ".join(os.path.basename(horizon_model_file(n)) for n in boosters))
+
+    p_ht, p_ft = boosters["HT"].predict(X), boosters["FT"].predict(X)
+    save_drift_profile(X, p_ht, p_ft)
+
+    ht, ft = Y[:, 0] >= 0, Y[:, 1] >= 0
+    save_distilled({"HT": (X[ht], p_ht[ht], Y[ht, 0], gids[ht]),
+                    "FT": (X[ft], p_ft[ft], Y[ft, 1], gids[ft])})
+    return win_models
+
+def main_hazard(conn):
+    # um único dataset/modelo; p_ht/p_ft (e qualquer janela) saem da curva de hazard
+    (X, y, gids), (X0, Y0, g0) = build_hazard_dataset(conn)
+    print(f"[train] final: HAZARD {X.shape}  origens={len(X0)}  taxa_gol={y.mean() if len(y) else 0:.4f}")
+
+    bst = train_one("HAZARD", X, y, gids, HAZARD_POS_WEIGHT,
+                    feature_names=FEATURE_ORDER + [hazard.TIME_FEATURE])
+    bst.save_model(HAZ_MODEL, num_iteration=bst.best_iteration)
+    print(f"[train] modelo salvo: {os.path.basename(HAZ_MODEL)} (model_type=hazard em horizons.json)")
+
+    # perfil e destilado sobre as origens (1 linha por minuto observado, como no split)
+    p_ht, p_ft = hazard.predict_ht_ft(bst, X0, FEATURE_ORDER.index("minute"))
+    save_drift_profile(X0, p_ht, p_ft)
+
+    ht, ft = Y0[:, 0] >= 0, Y0[:, 1] >= 0
+    save_distilled({"HT": (X0[ht], p_ht[ht], Y0[ht, 0], g0[ht]),
+                    "FT": (X0[ft], p_ft[ft], Y0[ft, 1], g0[ft])})
+    return {}
+
 if __name__ == "__main__":
     main()
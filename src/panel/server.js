@@ -8,8 +8,9 @@ const DB_PATH = process.env.DB_PATH || path.join(__dirname, '..', '..', 'data',
 const PORT    = Number(process.env.PANEL_PORT || 3000);
 const LIVE_WINDOW_MS = Number(process.env.LIVE_WINDOW_MS || 3 * 60 * 1000); // últimos 3 min
 const RECENT_SIGNALS = Number(process.env.RECENT_SIGNALS || 10);
-// >>> alinhado com o analisador (default 6 min)
-const PRESS_WINDOW_MIN = Math.max(1, Number(process.env.PRESS_WINDOW_MIN || 6));
+// push (SSE) das linhas alteradas do live_state: 1 consulta por intervalo, compartilhada por todas as abas
+const LIVE_PUSH_MS = Math.max(250, Number(process.env.LIVE_PUSH_MS || 1000));
+const SSE_PING_MS  = 15000;
 
 const db = new Better(DB_PATH);
 db.pragma('journal_mode = WAL', { simple: true });
@@ -58,6 +59,25 @@ CREATE TABLE IF NOT EXISTS signals (
   home       TEXT,
   away       TEXT
 );
+
+/* Estado vivo por jogo — mantido pelo ingest/analisador (src/db.js). */
+CREATE TABLE IF NOT EXISTS live_state (
+  event_id     TEXT PRIMARY KEY,
+  ts INTEGER, minute INTEGER, status TEXT,
+  league TEXT, home TEXT, away TEXT, url TEXT,
+  goals_home INTEGER, goals_away INTEGER, st_home INTEGER, st_away INTEGER,
+  sot_home INTEGER, sot_away INTEGER, soff_home INTEGER, soff_away INTEGER,
+  da_home INTEGER, da_away INTEGER, corners_home INTEGER, corners_away INTEGER,
+  sblk_home INTEGER, sblk_away INTEGER, bc_home INTEGER, bc_away INTEGER,
+  xg_home REAL, xg_away REAL,
+  press_home REAL, press_away REAL,
+  d_sblk_home INTEGER, d_sblk_away INTEGER, d_bc_home INTEGER, d_bc_away INTEGER,
+  d_xg_home REAL, d_xg_away REAL,
+  preds TEXT,
+  seq INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_live_state_ts  ON live_state(ts);
+CREATE INDEX IF NOT EXISTS idx_live_state_seq ON live_state(seq);
 `);
 
 // ——— Índices dinâmicos para signals ———
@@ -75,64 +95,27 @@ if (tableExists('signals')) {
   } catch {}
 }
 
-// ——— Prepared: último tick de cada jogo “vivo” ———
-// (inclui colunas novas: sblk/bc/xg)
-const stmtLiveRows = db.prepare(`
-  SELECT
-    t.event_id, t.ts, t.minute, t.status,
-    t.goals_home, t.goals_away,
-    t.st_home, t.st_away, t.sot_home, t.sot_away,
-    t.soff_home, t.soff_away, t.da_home, t.da_away,
-    t.corners_home, t.corners_away,
-    t.sblk_home, t.sblk_away, t.bc_home, t.bc_away,
-    t.xg_home, t.xg_away,
-    m.league, m.home, m.away, m.url
-  FROM ticks t
-  JOIN (
-    SELECT event_id, MAX(ts) AS ts
-    FROM ticks
-    WHERE ts > @cutoff
-    GROUP BY event_id
-  ) last ON last.event_id = t.event_id AND last.ts = t.ts
-  LEFT JOIN matches m ON m.event_id = t.event_id
-  ORDER BY t.ts DESC
-`);
-
-// (fallback ocasional)
-const stmtPrevTick = db.prepare(`
-  SELECT *
-  FROM ticks
-  WHERE event_id = ? AND ts < ?
+// ——— Prepared: jogos “vivos” (1 linha por jogo, já com baseline/pressão e previsões) ———
+const stmtLiveState = db.prepare(`
+  SELECT * FROM live_state
+  WHERE ts > @cutoff
   ORDER BY ts DESC
-  LIMIT 1
 `);
-
-// ——— Prepared: baseline por “minuto de jogo” (alinhado ao analisador) ———
-const stmtBaselineByMinute = db.prepare(`
-  SELECT *
-  FROM ticks
-  WHERE event_id = ? AND minute IS NOT NULL AND minute <= ?
-  ORDER BY minute DESC, ts DESC
-  LIMIT 1
+const stmtLiveChanged = db.prepare(`
+  SELECT * FROM live_state
+  WHERE seq > @since AND ts > @cutoff
+  ORDER BY seq
 `);
-
-// ——— Prepared: previsões mais recentes por (jogo, janela), com corte de “vivo” ———
-const stmtLatestPredictions = db.prepare(`
-  SELECT p.*
-  FROM predictions p
-  JOIN (
-    SELECT event_id, window_min, MAX(ts) AS ts
-    FROM predictions
-    WHERE ts > @cutoff
-    GROUP BY event_id, window_min
-  ) last
-    ON last.event_id = p.event_id
-   AND last.window_min = p.window_min
-   AND last.ts = p.ts
-  WHERE p.event_id IN (
-    SELECT event_id FROM (SELECT DISTINCT event_id FROM ticks WHERE ts > @cutoff)
-  )
+const stmtLiveIds = db.prepare(`SELECT event_id FROM live_state WHERE ts > @cutoff`);
+// linhas sem mudança cujas previsões saíram da janela em (from, to]: reenvia sem elas
+const stmtLivePredsExpired = db.prepare(`
+  SELECT * FROM live_state s
+  WHERE s.seq <= @since AND s.ts > @to
+    AND EXISTS (SELECT 1 FROM json_each(s.preds) j
+                WHERE json_extract(j.value, '$.ts') > @from AND json_extract(j.value, '$.ts') <= @to)
 `);
+const stmtLiveCount = db.prepare(`SELECT COUNT(*) AS c FROM live_state WHERE ts > @cutoff`);
+const stmtLiveMaxSeq = db.prepare(`SELECT COALESCE(MAX(seq), 0) AS s FROM live_state`);
 
 // ——— Prepared: signals (ORDER BY dinâmico) ———
 let stmtOpenSignals = null;
@@ -178,114 +161,125 @@ if (tableExists('signals')) {
 const app = express();
 
 // ——— utils ———
-function pressureFromDelta(dh, da) {
-  const ph = (dh.sot || 0) * 3 + (dh.soff || 0) * 1.5 + (dh.da || 0) * 0.5 + (dh.corners || 0) * 0.5;
-  const pa = (da.sot || 0) * 3 + (da.soff || 0) * 1.5 + (da.da || 0) * 0.5 + (da.corners || 0) * 0.5;
-  return { home: +ph.toFixed(2), away: +pa.toFixed(2) };
+// só previsões recentes (ts > cutoff): janela que parou de ser pontuada some do painel
+function parsePreds(json, cutoff) {
+  try {
+    return Object.entries(JSON.parse(json || '{}'))
+      .filter(([, v]) => v && v.ts > cutoff)
+      .map(([w, v]) => ({ window_min: Number(w), prob: v.p }))
+      .sort((a, b) => a.window_min - b.window_min);
+  } catch { return []; }
+}
+
+// linha do live_state -> formato de /api/live
+function liveRowOut(r, cutoff) {
+  return {
+    event_id: r.event_id,
+    ts: r.ts,
+    url: r.url,
+    league: r.league,
+    home: r.home, away: r.away,
+    minute: r.minute, status: r.status,
+    goals_home: r.goals_home, goals_away: r.goals_away,
+
+    // stats “atuais”
+    st_home: r.st_home, st_away: r.st_away,
+    sot_home: r.sot_home, sot_away: r.sot_away,
+    soff_home: r.soff_home, soff_away: r.soff_away,
+    da_home: r.da_home, da_away: r.da_away,
+    corners_home: r.corners_home, corners_away: r.corners_away,
+
+    // novas métricas “atuais”
+    sblk_home: r.sblk_home, sblk_away: r.sblk_away,
+    bc_home:   r.bc_home,   bc_away:   r.bc_away,
+    xg_home:   r.xg_home,   xg_away:   r.xg_away,
+
+    // pressão (Δ6m ponderado, calculada no ingest)
+    pressure: { home: r.press_home ?? 0, away: r.press_away ?? 0 },
+
+    // deltas na janela (útil pro front/heat)
+    window_delta: {
+      sblk_home: r.d_sblk_home, sblk_away: r.d_sblk_away,
+      bc_home:   r.d_bc_home,   bc_away:   r.d_bc_away,
+      xg_home:   r.d_xg_home,   xg_away:   r.d_xg_away,
+    },
+
+    // previsões por janela
+    windows: parsePreds(r.preds, cutoff)
+  };
+}
+
+// ——— SSE: push incremental do live_state ———
+const sseClients = new Set();
+let liveSeq = stmtLiveMaxSeq.get().s;
+let liveCutoff = Date.now() - LIVE_WINDOW_MS;
+let liveIds = new Set(stmtLiveIds.all({ cutoff: liveCutoff }).map(r => r.event_id));
+
+function sseSend(res, event, data) {
+  res.write(`event: ${event}\ndata: ${JSON.stringify(data)}\n\n`);
+}
+
+function pushLiveChanges() {
+  const cutoff = Date.now() - LIVE_WINDOW_MS;
+  // 'remove' = saiu da janela ou foi apagado (closeMatch)
+  const ids = new Set(stmtLiveIds.all({ cutoff }).map(r => r.event_id));
+  const removed = [...liveIds].filter(id => !ids.has(id));
+  liveIds = ids;
+  if (!sseClients.size) {
+    // ninguém ouvindo: só avança os cursores
+    liveSeq = stmtLiveMaxSeq.get().s;
+    liveCutoff = cutoff;
+    return;
+  }
+  const changed = stmtLiveChanged.all({ since: liveSeq, cutoff });
+  const stale = stmtLivePredsExpired.all({ since: liveSeq, from: liveCutoff, to: cutoff });
+  if (changed.length) liveSeq = changed[changed.length - 1].seq;
+  liveCutoff = cutoff;
+
+  const rows = changed.concat(stale).map(r => liveRowOut(r, cutoff));
+  if (rows.length) {
+    for (const res of sseClients) sseSend(res, 'upsert', rows);
+  }
+  if (removed.length) {
+    for (const res of sseClients) sseSend(res, 'remove', removed);
+  }
 }
+setInterval(() => { try { pushLiveChanges(); } catch {} }, LIVE_PUSH_MS);
+setInterval(() => { for (const res of sseClients) res.write(': ping\n\n'); }, SSE_PING_MS);
 
 // ——— rotas ———
 app.get('/api/live', (req, res) => {
   try {
     const cutoff = Date.now() - LIVE_WINDOW_MS;
-
-    // previsões “vivas”
-    const preds = stmtLatestPredictions.all({ cutoff });
-    const predsByEvent = new Map();
-    for (const p of preds) {
-      const arr = predsByEvent.get(p.event_id) || [];
-      arr.push({ window_min: p.window_min, prob: p.prob });
-      predsByEvent.set(p.event_id, arr);
-    }
-
-    // último tick “vivo” por jogo
-    const lastRows = stmtLiveRows.all({ cutoff });
-    const out = [];
-
-    for (const r of lastRows) {
-      // baseline por minuto de jogo (minuteNow - PRESS_WINDOW_MIN)
-      const minuteNow = Number.isFinite(r.minute) ? r.minute : 0;
-      const targetMin = Math.max(0, (minuteNow || 0) - PRESS_WINDOW_MIN);
-
-      // tenta baseline alinhado ao analisador; se não houver (início), cai pro tick anterior; se ainda não houver, usa o próprio
-      const base = stmtBaselineByMinute.get(r.event_id, targetMin)
-                || stmtPrevTick.get(r.event_id, r.ts)
-                || r;
-
-      // deltas de 6min para pressão (e para novas métricas também, útil no front)
-      const deltaH = {
-        sot: (r.sot_home || 0) - (base?.sot_home || 0),
-        soff: (r.soff_home || 0) - (base?.soff_home || 0),
-        da: (r.da_home || 0) - (base?.da_home || 0),
-        corners: (r.corners_home || 0) - (base?.corners_home || 0),
-        sblk: (r.sblk_home || 0) - (base?.sblk_home || 0),
-        bc:   (r.bc_home   || 0) - (base?.bc_home   || 0),
-        xg:   (r.xg_home   || 0) - (base?.xg_home   || 0),
-      };
-      const deltaA = {
-        sot: (r.sot_away || 0) - (base?.sot_away || 0),
-        soff: (r.soff_away || 0) - (base?.soff_away || 0),
-        da: (r.da_away || 0) - (base?.da_away || 0),
-        corners: (r.corners_away || 0) - (base?.corners_away || 0),
-        sblk: (r.sblk_away || 0) - (base?.sblk_away || 0),
-        bc:   (r.bc_away   || 0) - (base?.bc_away   || 0),
-        xg:   (r.xg_away   || 0) - (base?.xg_away   || 0),
-      };
-
-      const press = pressureFromDelta(deltaH, deltaA);
-
-      out.push({
-        event_id: r.event_id,
-        ts: r.ts,
-        url: r.url,
-        league: r.league,
-        home: r.home, away: r.away,
-        minute: r.minute, status: r.status,
-        goals_home: r.goals_home, goals_away: r.goals_away,
-
-        // stats “atuais”
-        st_home: r.st_home, st_away: r.st_away,
-        sot_home: r.sot_home, sot_away: r.sot_away,
-        soff_home: r.soff_home, soff_away: r.soff_away,
-        da_home: r.da_home, da_away: r.da_away,
-        corners_home: r.corners_home, corners_away: r.corners_away,
-
-        // novas métricas “atuais”
-        sblk_home: r.sblk_home, sblk_away: r.sblk_away,
-        bc_home:   r.bc_home,   bc_away:   r.bc_away,
-        xg_home:   r.xg_home,   xg_away:   r.xg_away,
-
-        // pressão (Δ6m ponderado)
-        pressure: press,
-
-        // deltas na janela (útil pro front/heat)
-        window_delta: {
-          sblk_home: deltaH.sblk, sblk_away: deltaA.sblk,
-          bc_home:   deltaH.bc,   bc_away:   deltaA.bc,
-          xg_home:   +(+deltaH.xg).toFixed(3), xg_away: +(+deltaA.xg).toFixed(3),
-        },
-
-        // previsões por janela
-        windows: (predsByEvent.get(r.event_id) || []).sort((a,b)=>a.window_min-b.window_min)
-      });
-    }
-
-    res.json({ ok: true, rows: out });
+    res.json({ ok: true, rows: stmtLiveState.all({ cutoff }).map(r => liveRowOut(r, cutoff)) });
   } catch (e) {
     res.status(500).json({ ok: false, error: String(e) });
   }
 });
 
+// snapshot inicial + 'upsert' (linhas alteradas) / 'remove' (event_ids que saíram da janela)
+app.get('/api/live/stream', (req, res) => {
+  res.set({
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive'
+  });
+  res.flushHeaders();
+  res.write('retry: 3000\n\n');
+  try {
+    const cutoff = Date.now() - LIVE_WINDOW_MS;
+    sseSend(res, 'snapshot', stmtLiveState.all({ cutoff }).map(r => liveRowOut(r, cutoff)));
+  } catch (e) {
+    sseSend(res, 'error', { error: String(e) });
+  }
+  sseClients.add(res);
+  req.on('close', () => sseClients.delete(res));
+});
+
 app.get('/api/snapshot', (req, res) => {
   try {
     const cutoff = Date.now() - LIVE_WINDOW_MS;
-    const live = db.prepare(`
-      SELECT COUNT(*) AS c FROM (
-        SELECT event_id, MAX(ts) AS ts
-        FROM ticks
-        WHERE ts > @cutoff
-        GROUP BY event_id
-      )`).get({ cutoff })?.c || 0;
+    const live = stmtLiveCount.get({ cutoff })?.c || 0;
 
     const open   = stmtOpenSignals   ? stmtOpenSignals.all().length                  : 0;
     const recent = stmtRecentSignals ? stmtRecentSignals.all({ n: RECENT_SIGNALS })  : [];
@@ -337,6 +331,5 @@ app.use('/static', express.static(path.join(__dirname, 'static')));
 
 app.listen(PORT, () => {
   console.log('[panel] usando DB:', DB_PATH);
-  console.log(`[panel] PRESS_WINDOW_MIN=${PRESS_WINDOW_MIN} min (alinhado ao analisador)`);
   console.log(`[panel] pronto em http://localhost:${PORT}`);
 });
@@ -471,13 +471,6 @@ function prettyFirstLine(h) {
   return `${h.home} (${sh}) x (${sa}) ${h.away} — ${h.league || ''}`;
 }
 
-// pressões ponderadas (mantida)
-function pressureFromDelta(dh, da) {
-  const ph = (dh.sot || 0) * 3 + (dh.soff || 0) * 1.5 + (dh.da || 0) * 0.5 + (dh.corners || 0) * 0.5;
-  const pa = (da.sot || 0) * 3 + (da.soff || 0) * 1.5 + (da.da || 0) * 0.5 + (da.corners || 0) * 0.5;
-  return { home: +ph.toFixed(2), away: +pa.toFixed(2) };
-}
-
 // encontra o tick base pela janela de minutos de jogo (<= currMin - PRESS_WINDOW_MIN)
 function findBaselineTickByMinute(ticksAsc, currMinute, winMin) {
   if (!Array.isArray(ticksAsc) || !ticksAsc.length) return null;
@@ -577,9 +570,15 @@ async function monitorMatch(ctx, url, eventId, db) {
         corners_home: s.corners_home, corners_away: s.corners_away,
       };
 
-      // salva tick
-      await db.insertTick(row);
-      // dentro do doTick(), depois de await db.insertTick(row);
+      // ---- DELTA NA JANELA DE 6 MIN (ou PRESS_WINDOW_MIN) POR MINUTO DE JOGO ----
+      // calculado uma vez: vai para o live_state (junto com o tick) e para o analisador
+      const hist = store.getTicksRange(eventId, 0, nowTs); // ordenado por ts
+      const base = findBaselineTickByMinute(hist, row.minute ?? 0, PRESS_WINDOW_MIN) || row;
+      const deltas = store.windowDeltas(row, base);
+      const press = store.pressureFromDelta(deltas.home, deltas.away);
+
+      // salva tick (+ estado vivo do painel, 1 linha por jogo) pelo db.js
+      store.insertTick(row, deltas);
       const goalHalf = require('../engine/goal_half_agent');
       await goalHalf.onTick({
         event_id: eventId,
@@ -590,26 +589,6 @@ async function monitorMatch(ctx, url, eventId, db) {
         ts: nowTs
       });
 
-
-      // ---- DELTA NA JANELA DE 6 MIN (ou PRESS_WINDOW_MIN) POR MINUTO DE JOGO ----
-      const hist = store.getTicksRange(eventId, 0, nowTs); // ordenado por ts
-      const base = findBaselineTickByMinute(hist, row.minute ?? 0, PRESS_WINDOW_MIN) || prev;
-
-      const dH = {
-        sot: (row.sot_home || 0) - ((base && base.sot_home) || 0),
-        soff: (row.soff_home || 0) - ((base && base.soff_home) || 0),
-        da:   (row.da_home   || 0) - ((base && base.da_home)   || 0),
-        corners: (row.corners_home || 0) - ((base && base.corners_home) || 0),
-      };
-      const dA = {
-        sot: (row.sot_away || 0) - ((base && base.sot_away) || 0),
-        soff: (row.soff_away || 0) - ((base && base.soff_away) || 0),
-        da:   (row.da_away   || 0) - ((base && base.da_away)   || 0),
-        corners: (row.corners_away || 0) - ((base && base.corners_away) || 0),
-      };
-
-      const press = pressureFromDelta(dH, dA);
-
       // dispara o analisador (ele grava predições e emite entradas se >= 0.90)
       const analyzer = require('../engine/live_analyzer');
       await analyzer.onTickAnalyze({
@@ -635,6 +614,7 @@ async function monitorMatch(ctx, url, eventId, db) {
           `[ENDED ${new Date().toISOString().replace('T',' ').slice(0,19)}] ${h.home} ${h.goalsHome ?? '?'}-${h.goalsAway ?? '?'} ${h.away}`
         );
         closed = true;
+        store.closeMatch(eventId);
         try { await page.close(); } catch {}
       }
     } catch {